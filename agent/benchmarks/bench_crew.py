@@ -0,0 +1,84 @@
+"""Crew runner against an offline model.
+
+Compares building PoemCrew with its YAML re-parsed each time against the
+cached config, then runs the triage crew's two independent tasks one
+after the other, concurrently, and again from the disk cache::
+
+    python benchmarks/bench_crew.py --first-token-latency 0.5
+"""
+import argparse
+import os
+import tempfile
+import time
+import timeit
+
+os.environ.setdefault("CREW_CACHE_DIR", tempfile.mkdtemp(prefix="crew-cache-"))
+
+import yaml
+from fake_llm import register
+
+from agent.crew_runner import CrewConfig, get_cache, load_crew_config
+from agent.crews.poem_crew.poem_crew import PoemCrew
+from agent.crews.triage_crew.triage_crew import TriageCrew
+from agent.llm import response_cache
+from agent.metrics import recent_traces
+
+REPEAT = 2000
+MESSAGES = [
+    "I'd like to book a demo of your menopause app next week",
+    "Can we schedule a consultation about elderly fall detection?",
+    "I need to talk to someone about integrating with our clinic's EHR",
+]
+
+
+def parse_each_time():
+    """What PoemCrew() cost before: both YAML files read and parsed per instance."""
+    config_dir = PoemCrew.config_dir
+    with open(config_dir / "agents.yaml", encoding="utf-8") as f:
+        agents = yaml.safe_load(f)
+    with open(config_dir / "tasks.yaml", encoding="utf-8") as f:
+        tasks = yaml.safe_load(f)
+    return CrewConfig("poem_crew", agents, tasks)
+
+
+def run(crew, message, sequential):
+    inputs = {"message": message, "event_types": "consultation, demo"}
+    started = time.perf_counter()
+    if sequential:
+        outputs = {}
+        for wave in crew.waves:
+            for name in wave:
+                outputs[name] = crew.run_task(name, inputs, outputs)
+    else:
+        crew.kickoff(inputs)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--first-token-latency", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    args = parser.parse_args()
+
+    load_crew_config.cache_clear()
+    for name, build in (("re-parsed", parse_each_time), ("cached", PoemCrew)):
+        seconds = timeit.timeit(build, number=REPEAT)
+        print(f"{name:>10} PoemCrew(): {seconds / REPEAT * 1e6:8.1f} us")
+
+    handler = register(args.tokens_per_second, args.first_token_latency)
+    crew = TriageCrew(model="fake/gemini-2.0-flash")
+    # These messages hold no personal details, so measure the disk cache too.
+    crew.cache = True
+    for label, sequential in (("sequential", True), ("concurrent", False), ("cached", False)):
+        if label != "cached":
+            get_cache().clear()
+            # The in-process response cache would answer repeats too.
+            response_cache.clear()
+        timings = [run(crew, message, sequential) for message in MESSAGES]
+        print(f"{label:>10} triage: {sum(timings) / len(timings) * 1e3:8.1f} ms/message")
+    print(f"model calls {next(handler.calls) - 1}, cache {get_cache().stats()}")
+    print(f"last trace {recent_traces('crew_task')[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Booking-detail extractor throughput and accuracy on a labelled set.
+
+Relative dates in the set are anchored to Monday 2025-03-03 10:00 in
+Asia/Karachi. A message counts as exact when every field matches::
+
+    python benchmarks/bench_extraction.py
+"""
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from agent.extraction import extract_booking
+from agent.timezones import get_zone
+
+EVAL_SET = Path(__file__).parent / "data" / "booking_eval.jsonl"
+FIELDS = ("name", "email", "start_time", "location")
+NOW = datetime(2025, 3, 3, 10, 0, tzinfo=get_zone("Asia/Karachi"))
+REPEAT = 200
+
+
+def main():
+    rows = [json.loads(line) for line in EVAL_SET.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    timings = []
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        for row in rows:
+            begin = time.perf_counter()
+            extract_booking(row["text"], "Asia/Karachi", NOW)
+            timings.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    print(f"extract: p50 {timings[len(timings) // 2] * 1e6:.1f} us, p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us, "
+          f"{len(timings) / elapsed:,.0f} messages/s")
+
+    correct = dict.fromkeys(FIELDS, 0)
+    exact = one_turn = 0
+    for row in rows:
+        details = extract_booking(row["text"], "Asia/Karachi", NOW)
+        misses = [field for field in FIELDS if getattr(details, field) != row[field]]
+        for field in FIELDS:
+            correct[field] += field not in misses
+        exact += not misses
+        one_turn += details.complete and not misses
+        for field in misses:
+            print(f"  {row['text']!r}: {field} expected {row[field]!r}, got {getattr(details, field)!r}")
+    print("  ".join(f"{field} {correct[field] / len(rows):.1%}" for field in FIELDS))
+    print(f"exact {exact}/{len(rows)}, bookable in one turn {one_turn}/{sum(all(row[f] for f in FIELDS[:3]) for row in rows)}")
+
+
+if __name__ == "__main__":
+    main()
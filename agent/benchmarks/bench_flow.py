@@ -0,0 +1,65 @@
+"""Per-turn framework overhead of RoutedFlow: ``kickoff()`` against the precompiled dispatch.
+
+Each turn reads "hello" and answers from the canned route, so the work
+done by the flow's own methods is tiny and the difference between the
+two is the cost of running the graph. ``direct`` calls the three methods
+by hand as the floor::
+
+    python benchmarks/bench_flow.py --turns 200
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import os
+import time
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+
+from agent.routed_flow import RoutedFlow
+
+LINE = "hello"
+
+
+def direct(flow):
+    user_input = flow.start_conversation()
+    flow.route_topic(user_input)
+    return flow.generate_canned()
+
+
+def measure(run, turns):
+    flow = RoutedFlow()
+    run(flow)  # warm up: intent model, config, dispatch tables
+    timings = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        output = run(flow)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return output, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    builtins.input = lambda prompt="": LINE
+    results = {}
+    for name, run in (("kickoff", RoutedFlow.kickoff), ("compiled", RoutedFlow.turn), ("direct", direct)):
+        # kickoff() also draws panels on the console; keep them out of the report.
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = measure(run, args.turns)
+
+    floor = results["direct"][1][args.turns // 2]
+    for name, (output, timings) in results.items():
+        p50 = timings[args.turns // 2]
+        print(f"{name:>9}: p50 {p50 * 1e6:9.1f} us  p99 {timings[int(args.turns * 0.99)] * 1e6:9.1f} us  "
+              f"overhead {(p50 - floor) * 1e6:9.1f} us")
+    assert results["kickoff"][0] == results["compiled"][0], "dispatch modes disagree"
+
+
+if __name__ == "__main__":
+    main()
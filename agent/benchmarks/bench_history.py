@@ -0,0 +1,52 @@
+"""Streamlit rerun time against chat history length, full render vs windowed.
+
+    python benchmarks/bench_history.py
+"""
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from agent.history import ChatHistory
+
+LENGTHS = (10, 100, 500, 1000)
+RUNS = 5
+
+FULL_RENDER = """
+import streamlit as st
+for message in st.session_state.messages:
+    with st.chat_message(message["role"]):
+        st.write(message["content"])
+"""
+
+WINDOWED_RENDER = """
+import streamlit as st
+from agent.chat_ui import render_history
+render_history(st.session_state.messages)
+"""
+
+CONTENT = "We offer AI-driven bots, multilingual conversational AI and personalised AI strategies. " * 3
+
+
+def rerun_time(script, messages):
+    app = AppTest.from_string(script, default_timeout=120)
+    app.session_state["messages"] = messages
+    app.run()
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[RUNS // 2]
+
+
+def main():
+    print(f"{'messages':>8} {'full':>10} {'windowed':>10}")
+    for length in LENGTHS:
+        rows = [{"role": "user" if i % 2 else "assistant", "content": CONTENT} for i in range(length)]
+        full = rerun_time(FULL_RENDER, rows)
+        windowed = rerun_time(WINDOWED_RENDER, ChatHistory(rows))
+        print(f"{length:>8} {full * 1e3:>8.1f}ms {windowed * 1e3:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
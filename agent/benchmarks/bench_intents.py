@@ -0,0 +1,48 @@
+"""Intent classifier latency (p50/p99) and accuracy on a held-out set.
+
+    python benchmarks/bench_intents.py
+"""
+import json
+import time
+from pathlib import Path
+
+from agent.intents import ESCALATE, INTENTS_CONFIG, IntentClassifier, load_training_data
+from agent.routing import load_config
+
+EVAL_SET = Path(__file__).parent / "data" / "intent_eval.jsonl"
+REPEAT = 200
+
+
+def main():
+    started = time.perf_counter()
+    classifier = IntentClassifier.train(*load_training_data())
+    print(f"train: {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    rows = [json.loads(line) for line in EVAL_SET.read_text(encoding="utf-8").splitlines() if line.strip()]
+    threshold = load_config(INTENTS_CONFIG)["threshold"]
+
+    timings = []
+    for _ in range(REPEAT):
+        for row in rows:
+            started = time.perf_counter()
+            classifier.predict(row["text"])
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"predict: p50 {timings[len(timings) // 2] * 1e6:.1f} us, p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us")
+
+    correct = answered_locally = 0
+    for row in rows:
+        intent, confidence = classifier.predict(row["text"])
+        if intent == ESCALATE or confidence < threshold:
+            intent = ESCALATE
+        else:
+            answered_locally += 1
+        if intent == row["intent"]:
+            correct += 1
+        else:
+            print(f"  {row['text']!r}: expected {row['intent']}, got {intent} ({confidence:.2f})")
+    print(f"accuracy {correct / len(rows):.1%}, answered locally {answered_locally}/{len(rows)} at threshold {threshold}")
+
+
+if __name__ == "__main__":
+    main()
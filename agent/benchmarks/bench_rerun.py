@@ -0,0 +1,117 @@
+"""Per-rerun cost of the Streamlit apps.
+
+Reports the setup each rerun used to repeat (loading .env, compiling the
+routers, building the flow) against the cached runtime lookup, then the
+median full rerun of each app under AppTest, and finally a full rerun
+against a rerun of each ``st.fragment`` pane alone at several history
+sizes. A widget change inside a pane costs the pane rerun; before the
+panes were fragments it cost the full one::
+
+    python benchmarks/bench_rerun.py --history 10 100 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+os.environ.setdefault("SESSION_STORE", "none")
+
+import streamlit as st
+from dotenv import load_dotenv
+from streamlit.testing.v1 import AppTest
+
+from agent.history import ChatHistory
+from agent.routing import KeywordRouter
+from agent.runtime import Runtime, load_env
+
+APPS = Path(__file__).resolve().parent.parent / "src" / "agent"
+RUNS = 20
+REPEAT = 2000
+PANES = {
+    "app.py": ("chat_pane", "schedule_pane"),
+    "with_form.py": ("chat_pane", "form_pane"),
+}
+# Flags that make every pane render, as it would mid-booking.
+STATE = {"show_schedule_form": True, "show_form": True, "event_type": "consultation"}
+
+
+def legacy_setup():
+    """What the top of app.py executed on every rerun before the runtime was cached."""
+    load_dotenv()
+    os.getenv("GEMINI_API_KEY")
+    KeywordRouter.from_config()
+    KeywordRouter({"healthtech": ["healthtech"], "femtech": ["femtech"], "agetech": ["agetech", "longevity"]}, default=None)
+
+
+@st.cache_resource
+def get_runtime():
+    return Runtime(object())
+
+
+def cached_setup():
+    """What it executes now: a no-op .env check and a cache_resource hit."""
+    load_env()
+    return get_runtime()
+
+
+def rerun_times(path, history=None):
+    app = AppTest.from_file(str(path), default_timeout=120)
+    if history is not None:
+        app.session_state["messages"] = history
+        for key, value in STATE.items():
+            app.session_state[key] = value
+    app.run()
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+
+def pane_script(app, pane):
+    """A script that runs just ``pane``, which is all a fragment rerun executes."""
+    script = Path(tempfile.mkdtemp(prefix="bench-rerun-")) / f"{pane}.py"
+    script.write_text(f"from agent.{Path(app).stem} import {pane}\n{pane}()\n")
+    return script
+
+
+def chat_history(size):
+    return ChatHistory(
+        {"role": ("user", "assistant")[i % 2], "content": f"message {i} " + "lorem ipsum " * 16}
+        for i in range(size)
+    )
+
+
+def p50_ms(timings):
+    return timings[RUNS // 2] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    for name, setup in (("legacy", legacy_setup), ("cached", cached_setup)):
+        seconds = timeit.timeit(setup, number=REPEAT)
+        print(f"{name:>8} setup: {seconds / REPEAT * 1e6:8.1f} us/rerun")
+
+    for app in ("app.py", "with_form.py"):
+        timings = rerun_times(APPS / app)
+        print(f"{app:>14}: p50 {timings[RUNS // 2] * 1e3:6.1f}ms  p90 {timings[int(RUNS * 0.9)] * 1e3:6.1f}ms")
+
+    for app, panes in PANES.items():
+        scripts = {pane: pane_script(app, pane) for pane in panes}
+        for size in args.history:
+            full = p50_ms(rerun_times(APPS / app, chat_history(size)))
+            report = "  ".join(
+                f"{pane} {p50_ms(rerun_times(script, chat_history(size))):6.1f}ms"
+                for pane, script in scripts.items()
+            )
+            print(f"{app:>14} history {size:>5}: full {full:6.1f}ms  {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Per-message routing cost and accuracy on the labelled routing corpus.
+
+    python benchmarks/bench_routing.py
+"""
+import json
+import timeit
+from pathlib import Path
+
+from agent.routing import KeywordRouter
+
+CORPUS = Path(__file__).parent / "data" / "routing_corpus.jsonl"
+REPEAT = 2000
+
+
+def legacy_route(user_input):
+    """The lower()/any() substring scan that process_user_input used to do."""
+    if any(word in user_input.lower() for word in ["schedule", "book", "meeting", "appointment", "time slot", "event", "session", "booking"]):
+        return "schedule_route"
+    elif any(word in user_input.lower() for word in ["healthtech", "femtech", "longevity", "agetech", "services", "solutions", "ai", "automation"]):
+        return "services_route"
+    else:
+        return "conversation_route"
+
+
+def accuracy(route, corpus):
+    misses = [(row["text"], row["route"], route(row["text"])) for row in corpus if route(row["text"]) != row["route"]]
+    return 1 - len(misses) / len(corpus), misses
+
+
+def main():
+    corpus = [json.loads(line) for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+    texts = [row["text"] for row in corpus]
+    router = KeywordRouter.from_config()
+
+    for name, route in (("legacy", legacy_route), ("compiled", router.route)):
+        seconds = timeit.timeit(lambda: [route(text) for text in texts], number=REPEAT)
+        score, misses = accuracy(route, corpus)
+        print(f"{name:>8}: {seconds / (REPEAT * len(texts)) * 1e6:.2f} us/message, accuracy {score:.1%}")
+        for text, expected, got in misses:
+            print(f"          {text!r}: expected {expected}, got {got}")
+
+
+if __name__ == "__main__":
+    main()
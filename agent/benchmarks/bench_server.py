@@ -0,0 +1,147 @@
+"""Many concurrent chat sessions against the line-protocol server.
+
+Starts agent.server in-process on top of the offline Cal.com and LLM
+stand-ins, connects ``--sessions`` clients that each send ``--messages``
+lines drawn from the benchmark corpora (answering the booking questions
+when a message routes to scheduling) and reports per-turn latency::
+
+    python benchmarks/bench_server.py --sessions 300 --messages 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from fake_calcom import start_server
+from fake_llm import register
+from loadtest import Recorder, SlotAllocator, load_messages
+
+
+async def read_reply(reader):
+    """Read one line from the server, without its newline."""
+    line = await reader.readline()
+    if not line:
+        raise EOFError()
+    return line.decode().rstrip("\n")
+
+
+async def book(reader, writer, user, slot):
+    start = datetime.fromisoformat(slot)
+    # Answered by prompt, since questions the request already answers are skipped.
+    answers = {
+        "name": f"User {user}",
+        "email": f"user{user}@example.com",
+        "timezone": "Asia/Karachi",
+        "When": f"{start:%Y-%m-%d %H:%M}",
+        "location": "inPerson",
+        "title": "Meeting",
+        "description": "",
+    }
+    while True:
+        line = await read_reply(reader)
+        if line.startswith("Agent:"):
+            return "Booking successfully" in line
+        if line.endswith(": "):
+            answer = next(answer for key, answer in answers.items() if key in line)
+            writer.write(f"{answer}\n".encode())
+
+
+async def run_client(user, args, messages, recorder, slots):
+    reader, writer = await asyncio.open_connection(args.host, args.port, limit=1 << 16)
+    rng = random.Random(user)
+    try:
+        welcome = await read_reply(reader)
+        if not welcome.startswith("Agent: Welcome"):
+            recorder.add("server", "rejected", 0.0, False)
+            return
+        for turn in range(args.messages):
+            text = rng.choice(messages)
+            if args.unique:
+                text = f"{text} ({user}-{turn})"
+            started = time.perf_counter()
+            writer.write(f"{text}\n".encode())
+            reply = await read_reply(reader)
+            if reply.startswith("Agent: Selected Event Type"):
+                ok = await book(reader, writer, user, slots.next())
+                route = "schedule"
+            else:
+                ok = not reply.startswith(("Agent: ERROR", "Agent: We are busy"))
+                route = "answer"
+            recorder.add("server", route, time.perf_counter() - started, ok)
+            if route == "answer" and any(word in reply.lower() for word in ["bye", "quit", "stop"]):
+                # The server says goodbye and ends the session, as the CLI does.
+                await read_reply(reader)
+                break
+            if args.think_time:
+                await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent client connections")
+    parser.add_argument("--messages", type=int, default=5, help="lines sent by each client")
+    parser.add_argument("--workers", type=int, default=64, help="server worker threads")
+    parser.add_argument("--max-pending", type=int, default=512, help="turns allowed to wait for a worker")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean pause between a client's lines, seconds")
+    parser.add_argument("--unique", action="store_true", help="make every prompt unique so the response cache never hits")
+    parser.add_argument("--calcom-latency", type=float, default=0.15)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--llm-first-token-latency", type=float, default=0.3)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    calcom = start_server(latency=args.calcom_latency, jitter=args.calcom_latency / 4)
+    # The agent modules read their configuration at import time.
+    os.environ["CALCOM_BASE_URL"] = calcom.base_url
+    os.environ["BOOKING_LEDGER_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-server-"), "bookings.db")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+    register(args.llm_tokens_per_second, args.llm_first_token_latency)
+
+    from agent.routed_flow import Conversation
+    from agent.server import ChatServer
+
+    Conversation.model = "fake/gemini-2.0-flash"
+    server = ChatServer(max_sessions=args.sessions, workers=args.workers, max_pending=args.max_pending)
+    ready = threading.Event()
+
+    def serve():
+        async def run():
+            listener = await asyncio.start_server(server.handle, args.host, args.port, backlog=args.sessions)
+            ready.set()
+            async with listener:
+                await listener.serve_forever()
+        asyncio.run(run())
+
+    threading.Thread(target=serve, name="chat-server", daemon=True).start()
+    ready.wait()
+
+    messages = load_messages()
+    recorder = Recorder()
+    slots = SlotAllocator()
+
+    async def clients():
+        await asyncio.gather(*(run_client(user, args, messages, recorder, slots) for user in range(args.sessions)))
+
+    started = time.perf_counter()
+    asyncio.run(clients())
+    wall = time.perf_counter() - started
+
+    for route, stats in recorder.report(wall).get("server", {}).items():
+        print(
+            f"{route:<9} n={stats['count']:<5} err={stats['errors']:<4} {stats['throughput_per_s']:7.1f}/s  "
+            f"p50 {stats['p50_ms']:7.1f}ms  p95 {stats['p95_ms']:7.1f}ms  p99 {stats['p99_ms']:7.1f}ms"
+        )
+    print(f"{args.sessions} sessions in {wall:.1f}s, server {server.stats()}, calcom requests {calcom.requests}")
+    calcom.shutdown()
+
+
+if __name__ == "__main__":
+    main()
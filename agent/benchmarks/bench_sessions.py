@@ -0,0 +1,71 @@
+"""Session store with several app replicas behind a load balancer without sticky sessions.
+
+Each turn lands on a random replica, which loads the session, adds a user
+message and an answer, flips a flag now and then, and saves. Reports
+per-turn latency and bytes written for the SQLite file and the Redis
+protocol (against ``fake_redis``), next to what rewriting the whole
+session every turn would write::
+
+    python benchmarks/bench_sessions.py --replicas 3 --sessions 50 --turns 40
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from fake_redis import start
+
+from agent.session_store import SESSION_CODEC, RedisBackend, RespClient, SessionStore, SQLiteBackend, pack
+
+ANSWER = "We build AI-powered solutions for HealthTech, FemTech, AgeTech and Longevity. " * 3
+
+
+def run(make_backend, args):
+    stores = [SessionStore(make_backend()) for _ in range(args.replicas)]
+    expected = {f"{index:032x}": [] for index in range(args.sessions)}
+    rng = random.Random(1)
+    timings, delta_bytes, full_bytes = [], 0, 0
+    for turn in range(args.turns):
+        for sid, messages in expected.items():
+            store = rng.choice(stores)
+            started = time.perf_counter()
+            data = store.load(sid)
+            history = data.history()
+            history.append({"role": "user", "content": f"question {turn} about our services?"})
+            history.append({"role": "assistant", "content": ANSWER})
+            fields = {"awaiting_schedule_confirmation": turn % 5 == 4, "show_schedule_form": False}
+            before = store.bytes_written
+            store.save(sid, history, fields)
+            timings.append(time.perf_counter() - started)
+            delta_bytes += store.bytes_written - before
+            messages += [["user", f"question {turn} about our services?"], ["assistant", ANSWER]]
+            full_bytes += len(pack({"messages": messages, "fields": fields}))
+
+    fresh = SessionStore(make_backend())
+    assert all(fresh.load(sid).messages == messages for sid, messages in expected.items()), "replicas diverged"
+    timings.sort()
+    turns = len(timings)
+    hits = sum(store.stats()["cached_loads"] for store in stores)
+    return (f"p50 {timings[turns // 2] * 1e3:6.2f}ms  p99 {timings[int(turns * 0.99)] * 1e3:6.2f}ms  "
+            f"written {delta_bytes / turns:7.0f} B/turn (full rewrite {full_bytes / turns:7.0f})  "
+            f"cache hits {hits / turns:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="sessions-"), "sessions.db")
+    redis = start()
+    url = f"redis://127.0.0.1:{redis.server_address[1]}/0"
+    print(f"codec {SESSION_CODEC}, {args.replicas} replicas, {args.sessions} sessions x {args.turns} turns")
+    print(f"  sqlite: {run(lambda: SQLiteBackend(path), args)}")
+    print(f"   redis: {run(lambda: RedisBackend(RespClient.from_url(url)), args)}  ({redis.commands} commands)")
+
+
+if __name__ == "__main__":
+    main()
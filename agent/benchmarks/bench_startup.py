@@ -0,0 +1,72 @@
+"""Cold-start import cost of the entry-point modules, checked against a budget.
+
+Each module is imported in a fresh interpreter under ``python -X importtime``;
+the best of ``--runs`` is compared with its budget, and crewai or litellm
+showing up where they should be loaded lazily is a failure too::
+
+    python benchmarks/bench_startup.py --runs 5
+
+Exits non-zero on any regression, so it can run in CI.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# module: (budget in ms, packages that must not be imported)
+BUDGETS = {
+    "agent.appointment": (600, ("crewai", "litellm", "streamlit")),
+    "agent.app": (1200, ("crewai", "litellm")),
+    "agent.with_form": (1200, ("crewai", "litellm")),
+}
+TOP = 5
+
+
+def import_profile(module):
+    """Return ``{package: (self_us, cumulative_us, depth)}`` for one cold import."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        profile[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="cold imports per module; the fastest counts")
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS))
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        budget, forbidden = BUDGETS.get(module, (None, ()))
+        profiles = [import_profile(module) for _ in range(args.runs)]
+        best = min(profiles, key=lambda profile: profile[module][1])
+        total_ms = best[module][1] / 1e3
+        over = budget is not None and total_ms > budget
+        leaked = sorted({name.split(".")[0] for name in best} & set(forbidden))
+        status = "FAIL" if over or leaked else "ok"
+        print(f"{module:>18}: {total_ms:7.1f} ms (budget {budget or '-'} ms) {status}")
+
+        children = sorted(
+            (entry[1], name) for name, entry in best.items() if entry[2] == 1 and name != module
+        )
+        for cumulative_us, name in children[::-1][:TOP]:
+            print(f"{'':>20}{name:<30} {cumulative_us / 1e3:7.1f} ms")
+        if leaked:
+            print(f"{'':>20}imports {', '.join(leaked)} eagerly")
+        failed = failed or over or bool(leaked)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
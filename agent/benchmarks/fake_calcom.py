@@ -0,0 +1,175 @@
+"""Offline stand-in for the parts of the Cal.com v1 API this app uses.
+
+Serves ``POST /v1/bookings``, ``GET /v1/slots`` and ``GET /v1/event-types``
+with configurable latency, error rate and 429 rate limiting::
+
+    python benchmarks/fake_calcom.py --port 8780 --latency 0.2 --error-rate 0.02 --rate-limit 20
+
+then point the app at it with ``CALCOM_BASE_URL=http://127.0.0.1:8780/v1``.
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+EVENT_TYPES = [
+    {"id": 1854515, "slug": "consultation", "title": "AiCogniTech", "length": 60},
+    {"id": 1854516, "slug": "demo", "title": "Product demo", "length": 30},
+]
+
+
+class FakeCalcom(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=0.0, retry_after=1.0):
+        super().__init__(address, FakeCalcomHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.booked = set()
+        self.booking_ids = itertools.count(1)
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def limited(self):
+        """Fixed one-second window limiter; True when the request must get a 429."""
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            return self._window_count > self.rate_limit
+
+
+class FakeCalcomHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _simulate(self):
+        """Apply latency, rate limiting and random errors; True if a response was sent."""
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, random.gauss(server.latency, server.jitter)))
+        if server.limited():
+            self._send(429, {"message": "Too many requests"}, {"Retry-After": str(server.retry_after)})
+            return True
+        if server.error_rate and random.random() < server.error_rate:
+            self._send(503, {"message": "Service unavailable"})
+            return True
+        return False
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self._simulate():
+            return
+        if urlparse(self.path).path != "/v1/bookings":
+            self._send(404, {"message": "Not found"})
+            return
+        try:
+            payload = json.loads(body)
+            slot = (payload["eventTypeId"], datetime.fromisoformat(payload["start"]).timestamp())
+        except (ValueError, KeyError):
+            self._send(400, {"message": "Invalid booking payload"})
+            return
+        with self.server.lock:
+            if slot in self.server.booked:
+                self._send(409, {"message": "This time slot is no longer available"})
+                return
+            self.server.booked.add(slot)
+            booking_id = next(self.server.booking_ids)
+        self._send(200, {"id": booking_id, "uid": f"fake-{booking_id}", "status": "ACCEPTED", **payload})
+
+    def do_GET(self):
+        if self._simulate():
+            return
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path == "/v1/slots":
+            self._send(200, {"slots": self._slots(query)})
+        elif url.path == "/v1/event-types":
+            self._send(200, {"event_types": EVENT_TYPES})
+        else:
+            self._send(404, {"message": "Not found"})
+
+    def _slots(self, query):
+        """Hourly slots from 09:00 to 16:00 in the requested timezone, minus booked ones."""
+        event_id = int(query.get("eventTypeId", 0))
+        zone = ZoneInfo(query.get("timeZone", "UTC"))
+        day = date.fromisoformat(query["startTime"][:10])
+        end = date.fromisoformat(query["endTime"][:10])
+        slots = {}
+        while day <= end:
+            free = []
+            for hour in range(9, 17):
+                start = datetime(day.year, day.month, day.day, hour, tzinfo=zone)
+                if (event_id, start.timestamp()) not in self.server.booked:
+                    free.append({"time": start.isoformat()})
+            slots[day.isoformat()] = free
+            day += timedelta(days=1)
+        return slots
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    """Start a fake Cal.com server on a background thread and return it."""
+    server = FakeCalcom((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="fake-calcom", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--latency", type=float, default=0.15, help="mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="latency standard deviation in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second before answering 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = FakeCalcom(
+        (args.host, args.port),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+    )
+    print(f"Fake Cal.com listening on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
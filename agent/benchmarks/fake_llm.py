@@ -0,0 +1,65 @@
+"""Fake litellm provider that answers offline at a configurable token rate.
+
+``register()`` makes every ``fake/<name>`` model resolve to it, e.g.
+``completion(model="fake/gemini-2.0-flash", ...)``.
+"""
+import itertools
+import time
+
+import litellm
+from litellm import CustomLLM
+
+ANSWER = (
+    "We build AI-powered solutions for HealthTech, FemTech, AgeTech and Longevity, "
+    "including multilingual assistants, appointment automation and predictive analytics. "
+    "Would you like to schedule a meeting with our team?"
+)
+
+
+class FakeLLM(CustomLLM):
+    """Answers with a fixed text after ``first_token_latency`` seconds, then
+    emits words at ``tokens_per_second``."""
+
+    def __init__(self, tokens_per_second=50.0, first_token_latency=0.3, answer=ANSWER):
+        super().__init__()
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.words = answer.split(" ")
+        self.calls = itertools.count(1)
+
+    def _tokens(self):
+        next(self.calls)
+        time.sleep(self.first_token_latency)
+        for index, word in enumerate(self.words):
+            if index:
+                time.sleep(1 / self.tokens_per_second)
+            yield word if index == len(self.words) - 1 else word + " "
+
+    def completion(self, *args, **kwargs):
+        text = "".join(self._tokens())
+        return litellm.ModelResponse(
+            model=kwargs.get("model"),
+            choices=[{"message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        )
+
+    def streaming(self, *args, **kwargs):
+        tokens = list(self.words)
+        for index, text in enumerate(self._tokens()):
+            last = index == len(tokens) - 1
+            yield {
+                "text": text,
+                "index": 0,
+                "is_finished": last,
+                "finish_reason": "stop" if last else None,
+                "tool_use": None,
+                "usage": None,
+            }
+
+
+def register(tokens_per_second=50.0, first_token_latency=0.3, answer=ANSWER):
+    """Install the fake provider under the ``fake/`` model prefix and return it."""
+    handler = FakeLLM(tokens_per_second, first_token_latency, answer)
+    litellm.custom_provider_map = [
+        entry for entry in litellm.custom_provider_map if entry["provider"] != "fake"
+    ] + [{"provider": "fake", "custom_handler": handler}]
+    return handler
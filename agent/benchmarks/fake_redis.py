@@ -0,0 +1,131 @@
+"""In-process stand-in for a Redis server, covering the commands the session store uses.
+
+Speaks RESP2 over TCP, so the real client code path is exercised::
+
+    python benchmarks/fake_redis.py --port 6380
+
+then point the apps at it with ``SESSION_STORE=redis://127.0.0.1:6380/0``.
+Keys expire lazily, when they are next read.
+"""
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, FakeRedisHandler)
+        self.data = {}
+        self.expires = {}
+        self.commands = 0
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+
+    def _get(self, key, default=None):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key, default)
+
+    def execute(self, command, args):
+        with self.lock:
+            self.commands += 1
+            if command in (b"PING", b"SELECT", b"AUTH"):
+                return "+PONG" if command == b"PING" else "+OK"
+            if command == b"FLUSHALL":
+                self.data.clear()
+                self.expires.clear()
+                return "+OK"
+            key = args[0]
+            if command == b"GET":
+                return self._get(key)
+            if command == b"SET":
+                self.data[key] = args[1]
+                self.expires.pop(key, None)
+                return "+OK"
+            if command == b"INCR":
+                value = int(self._get(key, b"0")) + 1
+                self.data[key] = str(value).encode()
+                return value
+            if command == b"EXPIRE":
+                if self._get(key) is None:
+                    return 0
+                self.expires[key] = time.monotonic() + int(args[1])
+                return 1
+            if command == b"DEL":
+                return sum(self.data.pop(key, None) is not None for key in args)
+            if command == b"RPUSH":
+                items = self.data.setdefault(key, [])
+                items.extend(args[1:])
+                return len(items)
+            if command == b"LLEN":
+                return len(self._get(key, []))
+            if command == b"LRANGE":
+                items = self._get(key, [])
+                start, stop = int(args[1]), int(args[2])
+                return items[start:None if stop == -1 else stop + 1]
+            if command == b"HSET":
+                fields = self.data.setdefault(key, {})
+                added = sum(name not in fields for name in args[1::2])
+                fields.update(zip(args[1::2], args[2::2]))
+                return added
+            if command == b"HGETALL":
+                return [item for pair in self._get(key, {}).items() for item in pair]
+            return f"-ERR unknown command '{command.decode()}'"
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.server.bytes_received += len(line) + sum(len(arg) + 8 for arg in args)
+            self.wfile.write(_encode(self.server.execute(args[0].upper(), args[1:])))
+
+
+def _encode(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, str):
+        return f"{reply}\r\n".encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+
+
+def start(port=0, host="127.0.0.1"):
+    """Serve on a background thread and return the server; ``port=0`` picks a free port."""
+    server = FakeRedis((host, port))
+    threading.Thread(target=server.serve_forever, name="fake-redis", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Redis server for the session store.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+    server = FakeRedis((args.host, args.port))
+    print(f"fake redis on {args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Load test StreamlitFlow and RoutedFlow against offline Cal.com and LLM stand-ins.
+
+Simulates concurrent users sending messages drawn from the benchmark
+corpora and reports throughput and p50/p95/p99 latency per route::
+
+    python benchmarks/loadtest.py --users 50 --messages 10 --out loadtest.json
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+from fake_calcom import start_server
+from fake_llm import register
+
+DATA = Path(__file__).parent / "data"
+MODEL = "fake/gemini-2.0-flash"
+
+
+def load_messages():
+    messages = []
+    for name in ("routing_corpus.jsonl", "intent_eval.jsonl"):
+        for line in (DATA / name).read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                messages.append(json.loads(line)["text"])
+    return messages
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, flow, route, seconds, ok=True):
+        with self.lock:
+            self.samples.setdefault((flow, route), []).append((seconds, ok))
+
+    def report(self, wall):
+        report = {}
+        for (flow, route), samples in sorted(self.samples.items()):
+            latencies = sorted(seconds for seconds, _ in samples)
+            report.setdefault(flow, {})[route] = {
+                "count": len(samples),
+                "errors": sum(1 for _, ok in samples if not ok),
+                "throughput_per_s": len(samples) / wall,
+                "p50_ms": percentile(latencies, 0.50) * 1e3,
+                "p95_ms": percentile(latencies, 0.95) * 1e3,
+                "p99_ms": percentile(latencies, 0.99) * 1e3,
+            }
+        return report
+
+
+class SlotAllocator:
+    """Hands out distinct future start times so bookings do not collide."""
+
+    def __init__(self):
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def next(self):
+        with self.lock:
+            index = next(self.counter)
+        day = date.today() + timedelta(days=1 + index // 8)
+        return f"{day.isoformat()}T{9 + index % 8:02d}:00:00+05:00"
+
+
+def run_streamlit_user(user, args, messages, recorder, slots):
+    from agent.app import StreamlitFlow
+    from agent.event_types import get_registry
+    from agent.booking_queue import get_pipeline
+    from agent.history import ChatHistory
+
+    flow = StreamlitFlow()
+    flow.model = MODEL
+    history = ChatHistory()
+    rng = random.Random(user)
+    for turn in range(args.messages):
+        text = rng.choice(messages)
+        if args.unique:
+            text = f"{text} ({user}-{turn})"
+        started = time.perf_counter()
+        ok = True
+        history.append({"role": "user", "content": text})
+        route = flow.process_user_input(text)
+        if route == "schedule_route":
+            pipeline = get_pipeline()
+            ticket = pipeline.submit(get_registry().default.id, f"User {user}", f"user{user}@example.com", slots.next())
+            result = pipeline.poll(ticket)
+            while result is None:
+                time.sleep(0.01)
+                result = pipeline.poll(ticket)
+            ok = result.ok
+            response = "booked" if ok else result.error
+        elif route == "services_route":
+            response = flow.handle_services_query(text)
+        elif route == "canned_route":
+            response = flow.handle_canned(text)
+        else:
+            response = "".join(flow.stream_conversation(text, history[:-1]))
+            ok = not response.startswith("Error:")
+        history.append({"role": "assistant", "content": response})
+        recorder.add("StreamlitFlow", route, time.perf_counter() - started, ok)
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def run_routed_user(user, args, messages, recorder, slots):
+    from agent.appointment import RoutedFlow, schedule_booking
+    from agent.event_types import get_registry
+
+    flow = RoutedFlow()
+    flow.model = MODEL
+    rng = random.Random(10_000 + user)
+    for turn in range(args.messages):
+        text = rng.choice(messages)
+        if args.unique:
+            text = f"{text} ({user}-{turn})"
+        started = time.perf_counter()
+        flow.state["user_input"] = text
+        route = flow.route_topic(text)
+        if route == "schedule_route":
+            ok = schedule_booking(get_registry().default.id, f"User {user}", f"user{user}@example.com", slots.next()) is not None
+        elif route == "canned_route":
+            ok = flow.generate_canned() is not None
+        else:
+            ok = flow.generate_conversation() is not None
+        recorder.add("RoutedFlow", route, time.perf_counter() - started, ok)
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated users per flow")
+    parser.add_argument("--messages", type=int, default=10, help="messages sent by each user")
+    parser.add_argument("--flows", default="streamlit,routed", help="comma separated: streamlit, routed")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's messages, seconds")
+    parser.add_argument("--unique", action="store_true", help="make every prompt unique so the response cache never hits")
+    parser.add_argument("--calcom-latency", type=float, default=0.15)
+    parser.add_argument("--calcom-error-rate", type=float, default=0.0)
+    parser.add_argument("--calcom-rate-limit", type=float, default=0.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--llm-first-token-latency", type=float, default=0.3)
+    parser.add_argument("--out", default="loadtest.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    server = start_server(
+        latency=args.calcom_latency,
+        jitter=args.calcom_latency / 4,
+        error_rate=args.calcom_error_rate,
+        rate_limit=args.calcom_rate_limit,
+    )
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    # The agent modules read their configuration at import time.
+    os.environ["CALCOM_BASE_URL"] = server.base_url
+    os.environ["BOOKING_LEDGER_PATH"] = os.path.join(workdir, "bookings.db")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+    llm = register(args.llm_tokens_per_second, args.llm_first_token_latency)
+
+    messages = load_messages()
+    recorder = Recorder()
+    slots = SlotAllocator()
+    runners = {"streamlit": run_streamlit_user, "routed": run_routed_user}
+    flows = [runners[name.strip()] for name in args.flows.split(",")]
+
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=args.users * len(flows)) as pool:
+            futures = [
+                pool.submit(runner, user, args, messages, recorder, slots)
+                for runner in flows
+                for user in range(args.users)
+            ]
+            for future in futures:
+                future.result()
+    wall = time.perf_counter() - started
+
+    from agent.llm import gateway, response_cache
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": vars(args),
+        "wall_seconds": wall,
+        "routes": recorder.report(wall),
+        "calcom_requests": server.requests,
+        "llm_calls": next(llm.calls) - 1,
+        "response_cache": response_cache.stats(),
+        "llm_gateway": gateway.stats(),
+    }
+    Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    for flow, routes in results["routes"].items():
+        for route, stats in routes.items():
+            print(
+                f"{flow:>13} {route:<18} n={stats['count']:<5} err={stats['errors']:<3} "
+                f"{stats['throughput_per_s']:7.1f}/s  p50 {stats['p50_ms']:7.1f}ms  "
+                f"p95 {stats['p95_ms']:7.1f}ms  p99 {stats['p99_ms']:7.1f}ms"
+            )
+    print(f"wrote {args.out}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
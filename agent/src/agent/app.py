@@ -1,24 +1,34 @@
 import streamlit as st
-from datetime import datetime, timedelta
-from crewai.flow.flow import Flow
-from litellm import completion
 import os
-from dotenv import load_dotenv
-import requests
+from datetime import datetime
+from agent.availability import format_slot, get_free_slots, is_bookable
+from agent.chat_ui import queue_booking, render_history, rerun_pane, restore_session, save_session, saves_session
+from agent.extraction import extract_booking
+from agent.intents import canned_answer, classify_intent
+from agent.knowledge import answer, knowledge_context
+from agent.llm import STREAM_RESPONSES, complete, stream
+from agent.metrics import profiled, start_exporters, timed
+from agent.prompting import assemble_prompt
+from agent.routing import KeywordRouter
+from agent.runtime import Runtime, load_env
+from agent.timezones import BUSINESS_TIMEZONE, timezone_names, working_hours_slots
 
-load_dotenv()
+load_env()
 
-CALCOM_API_KEY = os.getenv("CALCOM_API_KEY")
-CALCOM_BASE_URL = "https://api.cal.com/v1"
-HEADERS = {"Content-Type": "application/json"}
-QUERYSTRING = {"apiKey": CALCOM_API_KEY}
+SYSTEM_PROMPT = """You are the assistant of EngageAI, which builds AI-powered solutions for HealthTech, AgeTech, FemTech and Longevity: AI-driven bots, multilingual conversational AI and personalized AI strategies. Answer briefly and helpfully, and offer to schedule a meeting when the user wants to talk to the team. Working hours are 9:00 AM to 5:00 PM every day."""
 
-EVENT_TYPE = {'id': 1854515, 'title': 'EngageAI'}
+INTENT_ROUTES = {
+    "scheduling": "schedule_route",
+    "services": "services_route",
+    "hours": "canned_route",
+    "smalltalk": "canned_route",
+    "bye": "canned_route",
+}
 
-def initialize_chat_history():
-    if "messages" not in st.session_state:
-        st.session_state.messages = [
-            {"role": "assistant", "content": """Welcome to EngageAI! 🌟  
+# Session-state flags shared through the session store with other replicas.
+SESSION_KEYS = ("awaiting_schedule_confirmation", "show_schedule_form", "event_type")
+
+GREETING = """Welcome to EngageAI! 🌟  
 
 Hello! EngageAI specializes in crafting innovative AI-powered solutions tailored for HealthTech, AgeTech, FemTech, and Longevity industries. We excel in:  
 
@@ -27,133 +37,157 @@ Hello! EngageAI specializes in crafting innovative AI-powered solutions tailored
 - **Personalized AI Strategies:** Accelerating market entry and enhancing operational efficiency.  
 
 How can we assist you today? Whether you're exploring AI adoption or looking for bespoke AI strategies, we're here to guide you.
-"""}
-        ]
-
-def schedule_booking(event_id, name, email, start_time, location="inPerson", title="Meeting", description="", timezone="Asia/Karachi"):
-    try:
-        start_datetime = datetime.fromisoformat(start_time)
-        end_datetime = start_datetime + timedelta(minutes=60)
-        end_time = end_datetime.isoformat()
-
-        url = f"{CALCOM_BASE_URL}/bookings"
-        payload = {
-            "eventTypeId": event_id,
-            "start": start_time,
-            "end": end_time,
-            "responses": {
-                "name": name,
-                "email": email,
-                "location": {
-                    "optionValue": "",
-                    "value": location
-                }
-            },
-            "metadata": {},
-            "timeZone": timezone,
-            "language": "en",
-            "title": title,
-            "description": description,
-            "status": "PENDING"
-        }
-        response = requests.post(url, headers=HEADERS, json=payload, params=QUERYSTRING)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return None
-
-class StreamlitFlow(Flow):
+"""
+
+# Injected by the full rerun only; fragment reruns leave it in place.
+CSS = """
+<style>
+    div[data-testid="stChatInput"] {
+        position: fixed !important;
+        bottom: 10px !important;
+        left: 5%;
+        width: 90%;
+        background-color: #343a40;
+        border-top: 1px solid #ddd;
+        z-index: 1000;
+        box-shadow: 0px -1px 5px rgba(0, 0, 0, 0.1);
+    }
+    div[data-testid="stChatInput"] input:focus {
+        outline: none !important;
+        box-shadow: 0px 0px 5px 2px orange !important;
+        border: 1px solid orange !important;
+        border-radius: 5px;
+    }
+    div[data-testid="stChatInput"] input {
+        padding: 1px !important;
+        width: 100% !important;
+    }
+</style>
+"""
+
+def initialize_chat_history():
+    if "messages" not in st.session_state:
+        restore_session(get_runtime().sessions, GREETING, SESSION_KEYS)
+
+BOOKING_POLL_INTERVAL = 0.5
+
+LOCATIONS = ["inPerson", "online", "phone"]
+
+@st.fragment(run_every=BOOKING_POLL_INTERVAL)
+def booking_status():
+    """Poll a queued booking on a timer, rerunning only this fragment until the result arrives."""
+    pending = st.session_state.get("pending_booking")
+    if not pending:
+        return
+
+    result = get_runtime().pipeline.poll(pending["ticket"])
+    if result is None:
+        with st.chat_message("assistant"):
+            st.info("Scheduling your appointment...")
+        return
+
+    del st.session_state.pending_booking
+    if result.ok:
+        confirmation_message = f"""
+                            Appointment scheduled successfully! 🎉
+
+                            **Details:**
+                            - Name: {pending["name"]}
+                            - Date: {pending["date"]}
+                            - Time: {pending["time"]} GMT{pending["offset"]}
+                            - Location: {pending["location"]}
+
+                            Please check your email ({pending["email"]}) for confirmation details.
+                            """
+        st.session_state.messages.append({"role": "assistant", "content": confirmation_message})
+    else:
+        st.session_state.messages.append({"role": "assistant", "content": "Failed to schedule the appointment. Please try again."})
+    st.rerun()
+
+class StreamlitFlow:
     model = "gemini/gemini-2.0-flash"
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+    def __init__(self):
+        self.router = KeywordRouter.from_config()
+
+    @timed("process_user_input")
     def process_user_input(self, user_input):
-        if any(word in user_input.lower() for word in ["schedule", "book", "meeting", "appointment", "time slot", "event", "session", "booking"]):
-            return "schedule_route"
-        elif any(word in user_input.lower() for word in ["healthtech", "femtech", "longevity", "agetech", "services", "solutions", "ai", "automation"]):
-            return "services_route"
-        else:
-            return "conversation_route"
+        route = self.router.route(user_input)
+        if route == "conversation_route":
+            route = INTENT_ROUTES.get(classify_intent(user_input), route)
+        return route
 
+    @timed("handle_services_query")
     def handle_services_query(self, user_input):
-        if "healthtech" in user_input.lower():
-            return """In HealthTech, we deliver personalized AI models for patient care, operational efficiency, and predictive analytics. Examples include medical chatbots, appointment automation, and clinical decision support systems. How can we assist you in HealthTech?"""
-        elif "femtech" in user_input.lower():
-            return """In FemTech, we provide AI solutions like menstrual tracking, fertility optimization tools, and personalized wellness recommendations. Would you like to explore any of these areas further?"""
-        elif "agetech" in user_input.lower() or "longevity" in user_input.lower():
-            return """In AgeTech and Longevity, our AI solutions support healthy aging through predictive analytics, smart healthcare monitoring, and cognitive health enhancement tools. Let us know your interest!"""
-        else:
-            return """We offer a wide range of AI-powered solutions across HealthTech, FemTech, AgeTech, and Longevity. Would you like to:  
+        return answer(user_input) or """We offer a wide range of AI-powered solutions across HealthTech, FemTech, AgeTech, and Longevity. Would you like to:  
             1. Explore automation for your business?  
             2. Learn about multilingual conversational AI?  
             3. Discuss personalized AI strategies?  
             Let us know your focus area."""
 
-    def handle_conversation(self, user_input):
+    @timed("handle_canned")
+    def handle_canned(self, user_input):
+        return canned_answer(classify_intent(user_input))
+
+    @timed("handle_conversation")
+    def handle_conversation(self, user_input, history=()):
         try:
-            response = completion(
-                model=self.model,
-                messages=[{"role": "user", "content": user_input}],
-                api_key=self.GEMINI_API_KEY
-            )
-            return response["choices"][0]["message"]["content"].strip()
+            messages = assemble_prompt(SYSTEM_PROMPT, history, user_input, knowledge_context(user_input))
+            return complete(self.model, messages, self.GEMINI_API_KEY)
         except Exception as e:
             return f"Error: {str(e)}"
 
-def main():
-    st.set_page_config(
-        page_title="EngageAI",
-        page_icon="🤖",
-        layout="wide"
-    )
+    @timed("stream_conversation")
+    def stream_conversation(self, user_input, history=()):
+        try:
+            messages = assemble_prompt(SYSTEM_PROMPT, history, user_input, knowledge_context(user_input))
+            yield from stream(self.model, messages, self.GEMINI_API_KEY)
+        except Exception as e:
+            yield f"Error: {str(e)}"
 
-    initialize_chat_history()
-    flow = StreamlitFlow()
-
-    # Custom CSS for prompt styling
-    st.markdown("""
-    <style>
-        div[data-testid="stChatInput"] {
-            position: fixed !important;
-            bottom: 10px !important;
-            left: 5%;
-            width: 90%;
-            background-color: #343a40;
-            border-top: 1px solid #ddd;
-            z-index: 1000;
-            box-shadow: 0px -1px 5px rgba(0, 0, 0, 0.1);
-        }
-        div[data-testid="stChatInput"] input:focus {
-            outline: none !important;
-            box-shadow: 0px 0px 5px 2px orange !important;
-            border: 1px solid orange !important;
-            border-radius: 5px;
-        }
-        div[data-testid="stChatInput"] input {
-            padding: 1px !important;
-            width: 100% !important;
-        }
-    </style>
-    """, unsafe_allow_html=True)
+@st.cache_resource
+def get_runtime():
+    """Build the flow once per process instead of on every rerun."""
+    return Runtime(StreamlitFlow())
 
-    with st.container():
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.write(message["content"])
+@st.fragment
+@saves_session(lambda: get_runtime().sessions, SESSION_KEYS)
+@timed("chat_pane")
+def chat_pane():
+    """Chat history and input; a message reruns only this pane unless it opens the schedule form."""
+    runtime = get_runtime()
+    flow = runtime.flow
+    render_history(st.session_state.messages)
 
-        if prompt := st.chat_input("Type your message here..."):
-            if st.session_state.get("awaiting_schedule_confirmation"):
-                if prompt.lower() in ["yes", "yeah", "yep", "sure"]:
-                    st.session_state.show_schedule_form = True
-                    st.session_state.awaiting_schedule_confirmation = False
-                else:
-                    st.session_state.messages.append({"role": "assistant", "content": "Alright! Let us know if there's anything else we can assist you with."})
-                    st.session_state.awaiting_schedule_confirmation = False
-            else:
-                st.session_state.messages.append({"role": "user", "content": prompt})
-                route = flow.process_user_input(prompt)
+    if prompt := st.chat_input("Type your message here..."):
+        if st.session_state.get("awaiting_schedule_confirmation"):
+            st.session_state.awaiting_schedule_confirmation = False
+            if prompt.lower() in ["yes", "yeah", "yep", "sure"]:
+                # The form sits outside this fragment, so revealing it takes a full rerun.
+                st.session_state.show_schedule_form = True
+                st.rerun()
+            st.session_state.messages.append({"role": "assistant", "content": "Alright! Let us know if there's anything else we can assist you with."})
+        else:
+            st.session_state.messages.append({"role": "user", "content": prompt})
+            route = flow.process_user_input(prompt)
 
-                if route == "schedule_route":
-                    response = """Great! Let's schedule your meeting.
+            if route == "schedule_route":
+                event_type = runtime.event_types.match(prompt)
+                st.session_state.event_type = event_type.slug
+                details = extract_booking(prompt)
+                if details.complete and is_bookable(event_type.id, details.start_time, details.timezone, event_type.length):
+                    # The message says who, when and where: book it without the form.
+                    error = queue_booking(runtime, event_type, details.name, details.email, details.start_time, details.location or "inPerson", "Meeting", prompt, details.timezone)
+                    if error:
+                        st.session_state.messages.append({"role": "assistant", "content": error})
+                    st.rerun()
+                if details.found:
+                    st.session_state.booking_details = details.as_dict()
+                    st.session_state.show_schedule_form = True
+                    st.session_state.messages.append({"role": "assistant", "content": "Let's schedule your meeting. I've filled in what you told me; please check the form below."})
+                    st.rerun()
+                response = """Great! Let's schedule your meeting.
 
 Here's what to do:
 - Provide your name, email, date, and time.
@@ -166,56 +200,101 @@ Once Submitted:
 - If there's an issue, we'll follow up with alternatives.
 
 Do you want to schedule an appointment?"""
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    st.session_state.awaiting_schedule_confirmation = True
-                elif route == "services_route":
-                    response = flow.handle_services_query(prompt)
-                    st.session_state.messages.append({"role": "assistant", "content": response})
+                st.session_state.messages.append({"role": "assistant", "content": response})
+                st.session_state.awaiting_schedule_confirmation = True
+            elif route == "services_route":
+                response = flow.handle_services_query(prompt)
+                st.session_state.messages.append({"role": "assistant", "content": response})
+            elif route == "canned_route":
+                response = flow.handle_canned(prompt)
+                st.session_state.messages.append({"role": "assistant", "content": response})
+            elif STREAM_RESPONSES:
+                with st.chat_message("user"):
+                    st.write(prompt)
+                with st.chat_message("assistant"):
+                    response = st.write_stream(flow.stream_conversation(prompt, st.session_state.messages[1:-1]))
+                st.session_state.messages.append({"role": "assistant", "content": response})
+            else:
+                response = flow.handle_conversation(prompt, st.session_state.messages[1:-1])
+                st.session_state.messages.append({"role": "assistant", "content": response})
+
+        rerun_pane()
+
+@st.fragment
+@timed("schedule_pane")
+def schedule_pane():
+    """The schedule form; changing a field reruns only this pane."""
+    runtime = get_runtime()
+    prefill = st.session_state.get("booking_details") or {}
+    with st.chat_message("assistant"):
+        st.markdown("### Schedule an Appointment")
+        st.markdown("<div class='working-hours'>Our working hours are from 9:00 AM to 5:00 PM every day.</div>", unsafe_allow_html=True)
+        st.markdown("\n")
+        name = st.text_input("Name", value=prefill.get("name") or "", placeholder="Enter your name")
+        email = st.text_input("Email", value=prefill.get("email") or "", placeholder="Enter your email")
+        # Bind the registry once; a background sync may swap it mid-render.
+        registry = runtime.event_types
+        event_types = list(registry)
+        event_type = st.selectbox(
+            "Meeting Type", options=event_types, format_func=lambda e: f"{e.title} ({e.length} min)",
+            index=event_types.index(registry.get(st.session_state.get("event_type"))),
+        )
+        date = st.date_input("Preferred Date", value=prefill.get("day") or "today")
+        timezones = timezone_names()
+        timezone = st.selectbox("Timezone", options=timezones, index=timezones.index(prefill.get("timezone") or BUSINESS_TIMEZONE))
+        slots = get_free_slots(event_type.id, date, timezone)
+        if slots is None:
+            # Cal.com is unreachable; offer the working-hours grid instead.
+            slots = working_hours_slots(date, timezone, event_type.length)
+        if slots:
+            start_time = st.selectbox(
+                "Preferred Time", options=slots, format_func=format_slot,
+                index=slots.index(prefill["start_time"]) if prefill.get("start_time") in slots else 0,
+            )
+            meeting_time = datetime.fromisoformat(start_time).time()
+        else:
+            st.warning("There are no free slots on this date. Please pick another day.")
+            meeting_time = None
+        location = st.selectbox("Location", options=LOCATIONS, index=LOCATIONS.index(prefill.get("location") or "inPerson"))
+        description = st.text_area("Description", placeholder="Additional details")
+
+        if st.button("Submit Appointment"):
+            if not name or not email or not date or not meeting_time:
+                st.session_state.messages.append({"role": "assistant", "content": "Please fill in all required fields to schedule the appointment."})
+                st.rerun()
+            else:
+                error = queue_booking(runtime, event_type, name, email, start_time, location, "Meeting", description, timezone)
+                if error:
+                    st.session_state.messages.append({"role": "assistant", "content": error})
                 else:
-                    response = flow.handle_conversation(prompt)
-                    st.session_state.messages.append({"role": "assistant", "content": response})
+                    st.session_state.show_schedule_form = False
+                st.rerun()
 
-            st.rerun()
+@timed("streamlit_rerun")
+def main():
+    st.set_page_config(
+        page_title="EngageAI",
+        page_icon="🤖",
+        layout="wide"
+    )
 
-        if st.session_state.get("show_schedule_form", False):
-            with st.chat_message("assistant"):
-                st.markdown("### Schedule an Appointment")
-                st.markdown("<div class='working-hours'>Our working hours are from 9:00 AM to 5:00 PM every day.</div>", unsafe_allow_html=True)
-                st.markdown("\n")
-                name = st.text_input("Name", placeholder="Enter your name")
-                email = st.text_input("Email", placeholder="Enter your email")
-                date = st.date_input("Preferred Date")
-                time = st.time_input("Preferred Time")
-                location = st.selectbox("Location", options=["inPerson", "online", "phone"])
-                timezone = st.text_input("Timezone", value="Asia/Karachi")
-                description = st.text_area("Description", placeholder="Additional details")
-
-                if st.button("Submit Appointment"):
-                    if not name or not email or not date or not time:
-                        st.session_state.messages.append({"role": "assistant", "content": "Please fill in all required fields to schedule the appointment."})
-                        st.rerun()
-                    else:
-                        start_time = f"{date}T{time.strftime('%H:%M:%S')}+05:00"
-                        result = schedule_booking(EVENT_TYPE['id'], name, email, start_time, location, "Meeting", description, timezone)
-
-                        if result:
-                            confirmation_message = f"""
-                            Appointment scheduled successfully! 🎉
+    start_exporters()
+    initialize_chat_history()
+    st.markdown(CSS, unsafe_allow_html=True)
 
-                            **Details:**
-                            - Name: {name}
-                            - Date: {date}
-                            - Time: {time.strftime('%H:%M:%S')} GMT+05:00
-                            - Location: {location}
+    with st.container():
+        chat_pane()
 
-                            Please check your email ({email}) for confirmation details.
-                            """
-                            st.session_state.messages.append({"role": "assistant", "content": confirmation_message})
-                        else:
-                            st.session_state.messages.append({"role": "assistant", "content": "Failed to schedule the appointment. Please try again."})
+        if st.session_state.get("show_schedule_form", False):
+            schedule_pane()
 
-                        st.session_state.show_schedule_form = False
-                        st.rerun()
+        if st.session_state.get("pending_booking"):
+            booking_status()
 
 if __name__ == "__main__":
-    main()
+    with profiled(st.query_params.get("profile") == "1", "streamlit"):
+        try:
+            main()
+        finally:
+            # st.rerun() ends a run with an exception; save on every exit.
+            save_session(get_runtime().sessions, SESSION_KEYS)
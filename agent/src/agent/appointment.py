@@ -1,85 +1,137 @@
-from crewai.flow.flow import Flow, start, listen, router
-from litellm import completion
 import os
-from dotenv import load_dotenv
+import time
 import requests
-from datetime import datetime, timedelta
-
-
-load_dotenv()
-
-CALCOM_API_KEY = os.getenv("CALCOM_API_KEY")
-CALCOM_BASE_URL = "https://api.cal.com/v1"
-HEADERS = {"Content-Type": "application/json"}
-QUERYSTRING = {"apiKey": CALCOM_API_KEY}
-
-
-EVENT_TYPE = {'id': 1854515, 'title': 'AiCogniTech'}
-
+from agent.availability import invalidate
+from agent.calcom import create_booking
+from agent.event_types import get_registry
+from agent.extraction import BookingDetails, extract_booking, parse_when
+from agent.ledger import get_ledger, idempotency_key
+from agent.metrics import profiled, start_exporters, timed
+from agent.routing import KeywordRouter
+from agent.runtime import load_env
+from agent.timezones import check_upcoming, check_working_hours, to_iso
+
+
+load_env()
+
+# "compiled" runs each turn through agent.dispatch; "kickoff" uses crewai's own runner.
+FLOW_DISPATCH = os.getenv("FLOW_DISPATCH", "compiled")
+# Triage asks the model twice before booking, so it is opt-in.
+TRIAGE_ENABLED = os.getenv("TRIAGE_ENABLED", "false").lower() in ("1", "true", "yes")
+SYSTEM_PROMPT = """You are the assistant of AICongiTech, which redefines health and wellness with AI innovations in FemTech, AgeTech, HealthTech and Longevity. Answer briefly and helpfully, and offer to schedule a meeting when the user wants to talk to the team. Working hours are 9:00 AM to 5:00 PM every day."""
+
+ROUTER = KeywordRouter.from_config(names=("schedule_route",))
+INTENT_ROUTES = {
+    "scheduling": "schedule_route",
+    "hours": "canned_route",
+    "smalltalk": "canned_route",
+    "bye": "canned_route",
+}
+
+@timed("schedule_booking")
 def schedule_booking(event_id, name, email, start_time, location="inPerson", title="Meeting", description="", timezone="Asia/Karachi"):
-    """Schedule a booking on Cal.com."""
+    """Schedule a booking on Cal.com, unless the ledger shows it was already made."""
+    ledger = get_ledger()
+    key = idempotency_key(email, start_time, event_id)
+    recorded = ledger.lookup(key)
+    if recorded is not None:
+        return recorded
+
+    started = time.perf_counter()
     try:
-        start_datetime = datetime.fromisoformat(start_time)
-        end_datetime = start_datetime + timedelta(minutes=60)
-        end_time = end_datetime.isoformat()
-
-        url = f"{CALCOM_BASE_URL}/bookings"
-        payload = {
-            "eventTypeId": event_id,
-            "start": start_time,
-            "end": end_time,
-            "responses": {
-                "name": name,
-                "email": email,
-                "location": {
-                    "optionValue": "",
-                    "value": location
-                }
-            },
-            "metadata": {},
-            "timeZone": timezone,
-            "language": "en",
-            "title": title,
-            "description": description,
-            "status": "PENDING"
-        }
-
-        response = requests.post(url, headers=HEADERS, json=payload, params=QUERYSTRING)
-        response.raise_for_status()
-
-        return response.json()
+        result = create_booking(event_id, name, email, start_time, location, title, description, timezone)
+        ledger.record(key, event_id, email, start_time, True, result, time.perf_counter() - started)
+        invalidate(event_id, start_time)
+        return result
     except requests.exceptions.RequestException as e:
+        ledger.record(key, event_id, email, start_time, False, latency=time.perf_counter() - started)
         print(f"Agent: Error scheduling the booking: {e}")
-        if e.response is not None:
-            pass
+        if e.response is not None and e.response.text:
+            # Cal.com explains rejected bookings (a taken slot, a bad field) in the body.
+            print(f"Agent: Cal.com responded: {e.response.text}")
         return None
 
-def schedule_tool():
-    """Interactive tool for scheduling a meeting."""
-    print(f"\nAgent: Selected Event Type: {EVENT_TYPE['title']}")
+def booking_dialogue(event_type, description="", details=None):
+    """Ask for the details of an ``event_type`` booking one question at a time.
+
+    A generator that yields each prompt and is sent the user's answer, so
+    the same questions can be asked over ``input()`` or a network session.
+    Questions answered by ``details`` (a ``BookingDetails`` read from the
+    request) are skipped; when they are complete nothing is asked at all.
+    Returns the arguments for ``schedule_booking``.
+    """
+    details = details or BookingDetails()
+    name = details.name or (yield "You: Enter your name: ").strip() or "Anonymous"
+    email = details.email or (yield "You: Enter your email: ").strip() or "example@example.com"
+
+    timezone = details.timezone
+    start_time = details.start_time
+    if start_time is None:
+        timezone = (yield f"You: Enter your timezone (default: {timezone}): ").strip() or timezone
+        when = (yield "You: When would you like to meet? (e.g. Tuesday 3pm or 2025-03-04 15:00): ").strip()
+        day, at = parse_when(when, timezone, day=details.day)
+        if day is None or at is None:
+            raise ValueError(f"Could not read a date and time from {when!r}")
+        # The offset follows from the zone on that date, DST included.
+        start_time = to_iso(day, at, timezone)
+    check_upcoming(start_time)
+    check_working_hours(start_time, event_type.length)
+
+    location = details.location or (yield "You: Enter location (default: inPerson): ").strip() or "inPerson"
+    title, description = "Meeting", description
+    if not details.complete:
+        title = (yield "You: Enter meeting title (default: Meeting): ").strip() or title
+        description = (yield f"You: Enter description (default: {description or 'Empty'}): ").strip() or description
+
+    return {
+        "event_id": event_type.id,
+        "name": name,
+        "email": email,
+        "start_time": start_time,
+        "location": location,
+        "title": title,
+        "description": description,
+        "timezone": timezone,
+    }
+
+def run_dialogue(dialogue, ask):
+    """Drive a dialogue generator, answering each prompt with ``ask(prompt)``."""
+    try:
+        prompt = next(dialogue)
+        while True:
+            prompt = dialogue.send(ask(prompt))
+    except StopIteration as done:
+        return done.value
+
+def triage_request(request):
+    """Pick the event type for a scheduling request, and the triage crew's notes on it.
+
+    Falls back to keyword matching with no notes when triage is off or fails.
+    """
+    registry = get_registry()
+    if TRIAGE_ENABLED and request:
+        try:
+            from agent.crews.triage_crew.triage_crew import triage
+
+            notes = triage(request, registry)
+            return registry.by_slug.get(notes.get("event_type")) or registry.match(request), notes
+        except Exception:
+            pass
+    return registry.match(request), {}
+
+def schedule_tool(request=""):
+    """Interactive tool for scheduling the meeting ``request`` asks for."""
+    event_type, notes = triage_request(request)
+    details = extract_booking(request)
+    print(f"\nAgent: Selected Event Type: {event_type.title} ({event_type.length} min)")
+    if details.complete:
+        print(f"Agent: Booking {details.start_time} for {details.name} <{details.email}>.")
+    description = notes.get("summary", "")
+    if notes.get("urgency") == "high":
+        description = f"[Urgent] {description}".strip()
 
     try:
-        name = input("You: Enter your name: ").strip() or "Anonymous"
-        email = input("You: Enter your email: ").strip() or "example@example.com"
-        
-        print("You: Enter your preferred meeting time:")
-        year = int(input("  Year (e.g., 2025): ").strip())
-        month = int(input("  Month (1-12): ").strip())
-        day = int(input("  Day (1-31): ").strip())
-        hour = int(input("  Hour (0-23): ").strip())
-        minute = int(input("  Minute (0-59): ").strip())
-        second = int(input("  Second (0-59): ").strip())
-        gmt_offset = input("  GMT Offset (e.g., +05:00): ").strip()
-        
-        start_time = f"{year:04d}-{month:02d}-{day:02d}T{hour:02d}:{minute:02d}:{second:02d}{gmt_offset}"
-        
-        timezone = input("You: Enter your timezone (e.g., Asia/Karachi): ").strip() or "Asia/Karachi"
-        
-        location = input("You: Enter location (default: inPerson): ").strip() or "inPerson"
-        title = input("You: Enter meeting title (default: Meeting): ").strip() or "Meeting"
-        description = input("You: Enter description (default: Empty): ").strip() or ""
-
-        result = schedule_booking(EVENT_TYPE['id'], name, email, start_time, location, title, description, timezone)
+        result = schedule_booking(**run_dialogue(booking_dialogue(event_type, description, details), input))
         if result:
             print("Agent: Booking successfully scheduled! Check your email for the confirmation and meeting details.")
         else:
@@ -87,53 +139,16 @@ def schedule_tool():
     except Exception as e:
         print(f"Agent: Error: {e}")
 
-class RoutedFlow(Flow):
-    model = "gemini/gemini-1.5-flash"
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-    @start()
-    def start_conversation(self):
-        user_input = input("You: ").strip()
-        self.state["user_input"] = user_input
-        return user_input
-
-    @router(start_conversation)
-    def route_topic(self, user_input):
-        if any(word in user_input.lower() for word in ["schedule", "book", "meeting", "appointment", "schedule a meeting", "schedule a meeting with", "schedule a meeting with me"]):
-            return "schedule_route"
-        else:
-            return "conversation_route"
-
-    @listen("schedule_route")
-    def generate_schedule(self):
-        print("Agent: Redirecting to the scheduling agent...")
-        schedule_tool()
-
-    @listen("conversation_route")
-    def generate_conversation(self):
-        user_input = self.state.get("user_input", "")
-        if not user_input:
-            print("Agent: No input provided.")
-            return
-
-        try:
-            response = completion(
-                model=self.model,
-                messages=[{"role": "user", "content": user_input}],
-                api_key=self.GEMINI_API_KEY
-            )
-            outline = response["choices"][0]["message"]["content"].strip()
-            print(f"Agent: {outline}")
-            return outline
-        except Exception as e:
-            print(f"Agent: ERROR: {e}")
-
 def main():
+    start_exporters()
     print("Agent: Welcome to AICongiTech! Redefining health and wellness with innovative AI solutions tailored for you. How may we assist you today?")
+    # crewai takes seconds to import, so it is only loaded once the welcome is shown.
+    from agent.routed_flow import RoutedFlow
+
     flow = RoutedFlow()
     while True:
         try:
-            output = flow.kickoff()
+            output = flow.turn() if FLOW_DISPATCH == "compiled" else flow.kickoff()
             if output and any(word in output.lower() for word in ["bye", "quit", "stop"]):
                 print("Agent: Take care! See you soon!")
                 break
@@ -142,8 +157,20 @@ def main():
             break
 
 def plot():
+    from agent.routed_flow import RoutedFlow
+
     flow = RoutedFlow()
     flow.plot()
 
+def __getattr__(name):
+    # Keep ``from agent.appointment import RoutedFlow`` working without
+    # importing crewai for callers that only need the booking helpers.
+    if name == "RoutedFlow":
+        from agent.routed_flow import RoutedFlow
+
+        return RoutedFlow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
-    main()
+    with profiled(bool(os.getenv("PROFILE_SESSION")), "cli"):
+        main()
@@ -0,0 +1,135 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+import requests
+
+from agent.cache import TTLCache
+from agent.calcom import CALCOM_BASE_URL, CONNECT_TIMEOUT, QUERYSTRING, READ_TIMEOUT, get_session
+from agent.metrics import register_stats
+from agent.timezones import MEETING_MINUTES, check_upcoming, check_working_hours
+
+SLOT_CACHE_TTL = float(os.getenv("SLOT_CACHE_TTL", "120"))
+SLOT_CACHE_SIZE = int(os.getenv("SLOT_CACHE_SIZE", "512"))
+SLOT_FETCH_DAYS = int(os.getenv("SLOT_FETCH_DAYS", "7"))
+SLOT_RETRY_AFTER = float(os.getenv("SLOT_RETRY_AFTER", "30"))
+
+# Keyed on (event_id, timezone, ISO date); values are tuples of ISO start times.
+# Module level, so every Streamlit session in the process shares it.
+_slots = TTLCache(maxsize=SLOT_CACHE_SIZE, ttl=SLOT_CACHE_TTL)
+_failures = TTLCache(maxsize=SLOT_CACHE_SIZE, ttl=SLOT_RETRY_AFTER)
+# One lock per key being fetched, so a slow fetch only holds up readers of
+# the same key; _fetch_lock guards the dict and is never held during I/O.
+_fetches = {}
+_fetch_lock = threading.Lock()
+# Failure entry meaning Cal.com could not be reached at all.
+UNREACHABLE = "unreachable"
+
+
+def fetch_slots(event_id, start_date, end_date, timezone="Asia/Karachi"):
+    """Fetch free slots from Cal.com for every day in ``start_date..end_date``.
+
+    Returns a dict mapping each ISO date to a tuple of ISO slot start times.
+    Raises ``requests.exceptions.RequestException`` on failure.
+    """
+    params = dict(QUERYSTRING)
+    params.update({
+        "eventTypeId": event_id,
+        "startTime": f"{start_date.isoformat()}T00:00:00",
+        "endTime": f"{end_date.isoformat()}T23:59:59",
+        "timeZone": timezone,
+    })
+    response = get_session().get(
+        f"{CALCOM_BASE_URL}/slots",
+        params=params,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+    )
+    response.raise_for_status()
+    slots = response.json().get("slots", {})
+
+    days = {}
+    day = start_date
+    while day <= end_date:
+        days[day.isoformat()] = tuple(
+            datetime.fromisoformat(slot["time"].replace("Z", "+00:00")).isoformat()
+            for slot in slots.get(day.isoformat(), [])
+        )
+        day += timedelta(days=1)
+    return days
+
+
+def get_free_slots(event_id, day, timezone="Asia/Karachi"):
+    """Return the free slot start times for ``day``, or None if Cal.com is unreachable.
+
+    A miss fetches ``SLOT_FETCH_DAYS`` days at once so that browsing nearby
+    dates is served from the cache.
+    """
+    key = (event_id, timezone, day.isoformat())
+    slots = _slots.get(key)
+    if slots is not None or _failures.get(key) or _failures.get(UNREACHABLE):
+        return slots
+
+    with _fetch_lock:
+        lock = _fetches.setdefault(key, threading.Lock())
+    try:
+        with lock:
+            slots = _slots.get(key)
+            if slots is not None or _failures.get(key) or _failures.get(UNREACHABLE):
+                return slots
+            try:
+                days = fetch_slots(event_id, day, day + timedelta(days=SLOT_FETCH_DAYS - 1), timezone)
+            except requests.exceptions.RequestException as e:
+                # Remember the failure briefly, for the whole window, so reruns
+                # do not stall on every render.
+                for offset in range(SLOT_FETCH_DAYS):
+                    _failures.set((event_id, timezone, (day + timedelta(days=offset)).isoformat()), True)
+                if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                    # Every other key would stall the same way.
+                    _failures.set(UNREACHABLE, True)
+                return None
+            for iso_day, day_slots in days.items():
+                _slots.set((event_id, timezone, iso_day), day_slots)
+            return days[day.isoformat()]
+    finally:
+        with _fetch_lock:
+            if _fetches.get(key) is lock:
+                del _fetches[key]
+
+
+def is_slot_free(event_id, start_time, timezone="Asia/Karachi"):
+    """Check a start time against the cached slots; None when availability is unknown."""
+    start = datetime.fromisoformat(start_time)
+    slots = get_free_slots(event_id, start.date(), timezone)
+    if slots is None:
+        return None
+    return any(datetime.fromisoformat(slot) == start for slot in slots)
+
+
+def is_bookable(event_id, start_time, timezone="Asia/Karachi", minutes=MEETING_MINUTES):
+    """Whether a start time can be booked as is: ahead, within working hours and not known to be taken."""
+    try:
+        check_upcoming(start_time)
+        check_working_hours(start_time, minutes)
+    except ValueError:
+        return False
+    return is_slot_free(event_id, start_time, timezone) is not False
+
+
+def format_slot(start_time):
+    """Label a slot start time for a picker, e.g. ``09:30``."""
+    return datetime.fromisoformat(start_time).strftime("%H:%M")
+
+
+def invalidate(event_id, start_time):
+    """Drop cached slots around a booked start time, in every timezone."""
+    booked = datetime.fromisoformat(start_time).date()
+    # The same instant can fall on the neighbouring date in another timezone.
+    affected = {(booked + timedelta(days=offset)).isoformat() for offset in (-1, 0, 1)}
+    _slots.discard_where(lambda key: key[0] == event_id and key[2] in affected)
+
+
+def cache_stats():
+    return _slots.stats()
+
+
+register_stats("slot_cache", cache_stats)
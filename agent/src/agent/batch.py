@@ -0,0 +1,251 @@
+"""Import appointments in bulk from a CSV or JSONL file.
+
+    batch_import appointments.csv --parallelism 8
+
+Each row needs ``name``, ``email`` and ``start_time`` (ISO 8601; without
+a UTC offset it is read as wall-clock time in the row's ``timezone``);
+``event_type`` (slug) or ``event_id``, ``location``, ``title``,
+``description`` and ``timezone`` are optional. The event type sets the
+meeting length, and meetings must fall within working hours. Every row
+is validated before anything is sent, then the valid ones go to Cal.com
+through a dedicated booking pipeline, so parallelism, rate limiting and
+429 back-off match the app.
+
+One JSON line per row is appended to the results file as it completes.
+That file is also the checkpoint: running the same import again skips
+rows already in it, and the booking ledger stops a row whose result was
+lost in a crash from being booked twice. Invalid rows are not
+checkpointed, so once fixed in the input they are picked up by the
+next run; failed bookings are only retried with ``--retry-failed``.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from agent.booking_queue import RATE_BURST, RATE_LIMIT, BookingPipeline, QueueFull
+from agent.event_types import EVENT_TYPES_SYNC, get_registry, sync_event_types
+from agent.ledger import get_ledger
+from agent.timezones import BUSINESS_TIMEZONE, check_upcoming, check_working_hours, localize
+
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "8"))
+BATCH_POLL_INTERVAL = 0.05
+
+REQUIRED = ("name", "email", "start_time")
+TEXT_FIELDS = ("name", "email", "start_time", "event_type", "location", "title", "description", "timezone")
+DEFAULTS = {
+    "location": "inPerson",
+    "title": "Meeting",
+    "description": "",
+    "timezone": BUSINESS_TIMEZONE,
+}
+
+
+def read_rows(path):
+    """Yield ``(row number, dict)`` from a CSV (with header) or JSONL file.
+
+    A JSONL line that does not parse is yielded as None, for ``validate_row``
+    to report.
+    """
+    path = Path(path)
+    with path.open(encoding="utf-8", newline="") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            number = 0
+            for line in f:
+                if line.strip():
+                    number += 1
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError:
+                        yield number, None
+        else:
+            yield from enumerate(csv.DictReader(f), start=1)
+
+
+def event_type_for(row):
+    """The registry event type a row names by ``event_type`` slug or ``event_id``, else the default."""
+    registry = get_registry()
+    if row.get("event_type"):
+        if row["event_type"] not in registry.by_slug:
+            raise ValueError(f"unknown event_type {row['event_type']!r}")
+        return registry.by_slug[row["event_type"]]
+    if row.get("event_id"):
+        try:
+            return registry.by_id[int(row["event_id"])]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"unknown event_id {row['event_id']!r}") from None
+    return registry.default
+
+
+def validate_row(row):
+    """Return the ``BookingPipeline.submit`` arguments for a row.
+
+    Raises ``ValueError`` describing the first problem found.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+    row = {key.strip(): (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+    for field in TEXT_FIELDS:
+        if row.get(field) is not None and not isinstance(row[field], str):
+            raise ValueError(f"{field} must be a string, not {type(row[field]).__name__}")
+    missing = [field for field in REQUIRED if not row.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    if "@" not in row["email"]:
+        raise ValueError(f"invalid email {row['email']!r}")
+    try:
+        start = datetime.fromisoformat(row["start_time"])
+    except ValueError:
+        raise ValueError(f"invalid start_time {row['start_time']!r}") from None
+    timezone = row.get("timezone") or DEFAULTS["timezone"]
+    if start.tzinfo is None:
+        # A wall-clock time in the row's zone; its offset follows from the date.
+        start = localize(start.date(), start.time(), timezone)
+    event_type = event_type_for(row)
+    check_upcoming(start.isoformat())
+    check_working_hours(start.isoformat(), event_type.length)
+
+    booking = {
+        "event_id": event_type.id,
+        "name": row["name"],
+        "email": row["email"],
+        "start_time": start.isoformat(),
+    }
+    for field, default in DEFAULTS.items():
+        booking[field] = row.get(field) or default
+    return booking
+
+
+def validate(rows):
+    """Validate every row up front; return ``(valid, invalid)`` lists of ``(number, booking or error)``."""
+    valid, invalid = [], []
+    for number, row in rows:
+        try:
+            valid.append((number, validate_row(row)))
+        except ValueError as e:
+            invalid.append((number, str(e)))
+    return valid, invalid
+
+
+def load_checkpoint(results_path, retry_failed=False):
+    """Row numbers already finished in a previous run of this import."""
+    done = set()
+    if not Path(results_path).exists():
+        return done
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; that row is simply redone.
+                continue
+            if result.get("invalid"):
+                continue
+            if result["ok"] or not retry_failed:
+                done.add(result["row"])
+    return done
+
+
+def import_bookings(path, results_path=None, parallelism=BATCH_PARALLELISM, rate=RATE_LIMIT, burst=RATE_BURST, retry_failed=False, strict=False, progress=None):
+    """Validate and book every row of ``path``, appending results to ``results_path``.
+
+    Returns a summary dict. With ``strict`` nothing is submitted when any
+    row is invalid. ``progress`` is called with ``(finished, total)``.
+    """
+    results_path = results_path or f"{path}.results.jsonl"
+    if EVENT_TYPES_SYNC:
+        # Rows are checked against the account's event types, so fetch them first.
+        sync_event_types()
+    done = load_checkpoint(results_path, retry_failed)
+    valid, invalid = validate((number, row) for number, row in read_rows(path) if number not in done)
+    summary = {"skipped": len(done), "invalid": len(invalid), "booked": 0, "failed": 0, "results": str(results_path)}
+    if strict and invalid:
+        for number, error in invalid:
+            print(f"row {number}: {error}", file=sys.stderr)
+        return summary
+
+    pipeline = BookingPipeline(workers=parallelism, queue_size=parallelism * 4, rate=rate, burst=burst)
+    total = len(valid) + len(invalid)
+    finished = 0
+    with open(results_path, "a", encoding="utf-8") as out:
+        def write(result):
+            nonlocal finished
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            finished += 1
+            if progress:
+                progress(finished, total)
+
+        for number, error in invalid:
+            write({"row": number, "ok": False, "invalid": True, "error": error})
+
+        pending = {}
+        rows = iter(valid)
+        next_row = next(rows, None)
+        while next_row is not None or pending:
+            while next_row is not None:
+                number, booking = next_row
+                try:
+                    ticket = pipeline.submit(**booking)
+                except QueueFull:
+                    break
+                pending[ticket] = (number, booking)
+                next_row = next(rows, None)
+
+            for ticket in list(pending):
+                result = pipeline.poll(ticket)
+                if result is None:
+                    continue
+                number, booking = pending.pop(ticket)
+                summary["booked" if result.ok else "failed"] += 1
+                write({
+                    "row": number,
+                    "ok": result.ok,
+                    "email": booking["email"],
+                    "start_time": booking["start_time"],
+                    "booking_id": (result.data or {}).get("id"),
+                    "error": result.error,
+                    "latency": round(result.latency, 3),
+                })
+            if pending:
+                time.sleep(BATCH_POLL_INTERVAL)
+    # The ledger commits in the background; a re-run relies on these rows.
+    get_ledger().flush()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Book appointments in bulk from a CSV or JSONL file.")
+    parser.add_argument("path", help="CSV with a header row, or JSONL")
+    parser.add_argument("--results", help="per-row results and checkpoint file (default: <path>.results.jsonl)")
+    parser.add_argument("--parallelism", type=int, default=BATCH_PARALLELISM, help="concurrent Cal.com requests")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT, help="bookings per second")
+    parser.add_argument("--burst", type=int, default=RATE_BURST)
+    parser.add_argument("--retry-failed", action="store_true", help="resubmit rows that failed in an earlier run")
+    parser.add_argument("--strict", action="store_true", help="submit nothing if any row is invalid")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def progress(finished, total):
+        if finished % 100 == 0 or finished == total:
+            print(f"{finished}/{total} rows done", file=sys.stderr)
+
+    try:
+        summary = import_bookings(
+            args.path, args.results, args.parallelism, args.rate, args.burst, args.retry_failed, args.strict, progress
+        )
+    finally:
+        # Also on Ctrl-C: bookings already made must reach the ledger before exit.
+        get_ledger().flush()
+    summary["seconds"] = round(time.perf_counter() - started, 1)
+    print(json.dumps(summary))
+    sys.exit(1 if summary["invalid"] or summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
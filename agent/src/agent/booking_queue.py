@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+import httpx
+
+from agent.availability import invalidate
+from agent.calcom import (
+    BACKOFF_FACTOR,
+    CALCOM_BASE_URL,
+    CONNECT_TIMEOUT,
+    HEADERS,
+    MAX_RETRIES,
+    QUERYSTRING,
+    READ_TIMEOUT,
+    build_booking_payload,
+    retry_post,
+)
+from agent.ledger import get_ledger, idempotency_key
+from agent.metrics import observe, register_stats
+
+QUEUE_SIZE = int(os.getenv("BOOKING_QUEUE_SIZE", "100"))
+WORKERS = int(os.getenv("BOOKING_WORKERS", "4"))
+RATE_LIMIT = float(os.getenv("CALCOM_RATE_LIMIT", "2"))
+RATE_BURST = int(os.getenv("CALCOM_RATE_BURST", "5"))
+LATENCY_WINDOW = 500
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the booking queue cannot take another submission."""
+
+
+class BookingResult:
+    """Outcome of a queued booking, returned by ``BookingPipeline.poll``."""
+
+    __slots__ = ("ticket", "ok", "data", "error", "latency")
+
+    def __init__(self, ticket, ok, data=None, error=None, latency=0.0):
+        self.ticket = ticket
+        self.ok = ok
+        self.data = data
+        self.error = error
+        self.latency = latency
+
+
+class RateLimiter:
+    """Token bucket that also backs off when Cal.com answers 429."""
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def _retry_after(response, attempt):
+    value = response.headers.get("Retry-After")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, BACKOFF_FACTOR)
+
+
+def _error_message(response):
+    try:
+        return response.json().get("message", "An error occurred.")
+    except ValueError:
+        return "Invalid response format from server."
+
+
+class BookingPipeline:
+    """Submits Cal.com bookings from a bounded queue on a background event loop.
+
+    Callers get a ticket back from ``submit`` straight away and collect the
+    outcome later with ``poll``, so a Streamlit rerun never waits on Cal.com.
+    Repeat submits of a booking already in the ledger, or already queued,
+    never reach Cal.com a second time.
+    """
+
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.rate = rate
+        self.burst = burst
+        self.results = {}
+        self._waiting = {}
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+        self._started = threading.Event()
+
+    def start(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._run, name="booking-pipeline", daemon=True).start()
+            self._started.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+
+    async def _serve(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        limiter = RateLimiter(self.rate, self.burst)
+        # Each worker holds at most one connection at a time.
+        limits = httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers)
+        timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+        async with httpx.AsyncClient(headers=HEADERS, limits=limits, timeout=timeout) as client:
+            workers = [asyncio.create_task(self._worker(client, limiter)) for _ in range(self.workers)]
+            self._started.set()
+            await asyncio.gather(*workers)
+
+    async def _worker(self, client, limiter):
+        while True:
+            key, payload = await self._queue.get()
+            with self._lock:
+                self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                ok, data, error = await self._post(client, limiter, payload)
+            except Exception as e:
+                ok, data, error = False, None, str(e)
+            latency = time.perf_counter() - started
+            observe("calcom_booking", latency)
+            # Neither may stop the worker; the waiting tickets must still resolve.
+            try:
+                if ok:
+                    invalidate(payload["eventTypeId"], payload["start"])
+            except Exception:
+                logger.exception("could not invalidate cached slots after a booking")
+            try:
+                get_ledger().record(key, payload["eventTypeId"], payload["responses"]["email"], payload["start"], ok, data, latency)
+            except Exception:
+                logger.exception("could not record a booking in the ledger")
+            with self._lock:
+                self.in_flight -= 1
+                self.latencies.append(latency)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                for ticket in self._waiting.pop(key):
+                    self.results[ticket] = BookingResult(ticket, ok, data, error, latency)
+            self._queue.task_done()
+
+    async def _post(self, client, limiter, payload):
+        for attempt in range(MAX_RETRIES + 1):
+            await limiter.acquire()
+            try:
+                response = await client.post(f"{CALCOM_BASE_URL}/bookings", json=payload, params=QUERYSTRING)
+            except httpx.ConnectError as e:
+                if attempt == MAX_RETRIES:
+                    return False, None, f"Could not reach Cal.com: {e}"
+                await asyncio.sleep(BACKOFF_FACTOR * (2 ** attempt))
+                continue
+            except httpx.HTTPError as e:
+                return False, None, f"Error scheduling the booking: {e}"
+
+            if retry_post(response.status_code, "Retry-After" in response.headers) and attempt < MAX_RETRIES:
+                delay = _retry_after(response, attempt)
+                if response.status_code == 429:
+                    limiter.pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            if response.is_error:
+                return False, None, _error_message(response)
+            return True, response.json(), None
+
+    def submit(self, event_id, name, email, start_time, location="inPerson", title="Meeting", description="", timezone="Asia/Karachi"):
+        """Queue a booking and return its ticket.
+
+        Raises ``ValueError`` for a malformed start time and ``QueueFull`` when
+        the queue is at capacity.
+        """
+        payload = build_booking_payload(event_id, name, email, start_time, location, title, description, timezone)
+        key = idempotency_key(email, start_time, event_id)
+        ticket = uuid.uuid4().hex
+
+        recorded = get_ledger().lookup(key)
+        if recorded is not None:
+            with self._lock:
+                self.results[ticket] = BookingResult(ticket, True, recorded)
+            return ticket
+
+        with self._lock:
+            if key in self._waiting:
+                self._waiting[key].append(ticket)
+                return ticket
+            # The worker records to the ledger before it clears _waiting, so a
+            # booking that finished since the lookup above shows up here.
+            recorded = get_ledger().lookup(key)
+            if recorded is not None:
+                self.results[ticket] = BookingResult(ticket, True, recorded)
+                return ticket
+            self._waiting[key] = [ticket]
+
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._enqueue(key, payload), self._loop)
+        try:
+            future.result()
+        except QueueFull as e:
+            with self._lock:
+                # Tickets that joined this booking meanwhile fail with it.
+                for other in self._waiting.pop(key):
+                    if other != ticket:
+                        self.results[other] = BookingResult(other, False, error=str(e))
+            raise
+        return ticket
+
+    async def _enqueue(self, key, payload):
+        try:
+            self._queue.put_nowait((key, payload))
+        except asyncio.QueueFull:
+            raise QueueFull("Too many bookings are waiting, please try again shortly.")
+
+    def poll(self, ticket):
+        """Return the ``BookingResult`` for a ticket, or None while it is pending."""
+        with self._lock:
+            return self.results.pop(ticket, None)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            in_flight = self.in_flight
+            completed = self.completed
+            failed = self.failed
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": in_flight,
+            "completed": completed,
+            "failed": failed,
+            "latency_p50": percentile(0.50),
+            "latency_p95": percentile(0.95),
+            "latency_max": latencies[-1] if latencies else None,
+        }
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Return the process-wide booking pipeline shared by all sessions."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = BookingPipeline()
+                register_stats("booking_pipeline", _pipeline.stats)
+    return _pipeline
@@ -0,0 +1,128 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from agent.event_types import get_registry
+from agent.metrics import timed
+from agent.runtime import load_env
+from agent.timezones import end_time
+
+load_env()
+
+CALCOM_API_KEY = os.getenv("CALCOM_API_KEY")
+CALCOM_BASE_URL = os.getenv("CALCOM_BASE_URL", "https://api.cal.com/v1")
+HEADERS = {"Content-Type": "application/json"}
+QUERYSTRING = {"apiKey": CALCOM_API_KEY}
+
+POOL_SIZE = int(os.getenv("CALCOM_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("CALCOM_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("CALCOM_READ_TIMEOUT", "20"))
+MAX_RETRIES = int(os.getenv("CALCOM_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("CALCOM_BACKOFF_FACTOR", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def retry_post(status_code, has_retry_after):
+    """Whether a booking POST answered with ``status_code`` is safe to send again.
+
+    A 500, 502 or 504 can arrive after Cal.com has already created the
+    booking, so only a 429 or a 503 that names a Retry-After is resent.
+    """
+    return status_code == 429 or (status_code == 503 and has_retry_after)
+
+
+class CalcomRetry(Retry):
+    """Retries idempotent requests on read errors and ``RETRY_STATUSES``, and POSTs only where ``retry_post`` allows.
+
+    POST is left out of ``allowed_methods``, so a read error on a booking is
+    never resent; its status retries are decided here instead.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method == "POST":
+            return retry_post(status_code, has_retry_after)
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def create_session(pool_size=POOL_SIZE, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """Build a keep-alive session with a pooled, retrying adapter for Cal.com."""
+    # Once a booking POST has been sent we cannot tell whether Cal.com created
+    # it, so it is only resent after a connect error or an answer
+    # ``retry_post`` accepts. GETs keep their read retries.
+    retry = CalcomRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Return the process-wide Cal.com session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def build_booking_payload(event_id, name, email, start_time, location="inPerson", title="Meeting", description="", timezone="Asia/Karachi", duration=None):
+    """Build the JSON body for a Cal.com booking.
+
+    ``duration`` defaults to the length of the event type in the registry.
+    """
+    if duration is None:
+        duration = get_registry().for_id(event_id).length
+    return {
+        "eventTypeId": event_id,
+        "start": start_time,
+        "end": end_time(start_time, duration, timezone),
+        "responses": {
+            "name": name,
+            "email": email,
+            "location": {
+                "optionValue": "",
+                "value": location
+            }
+        },
+        "metadata": {},
+        "timeZone": timezone,
+        "language": "en",
+        "title": title,
+        "description": description,
+        "status": "PENDING"
+    }
+
+
+@timed("calcom_booking")
+def create_booking(event_id, name, email, start_time, location="inPerson", title="Meeting", description="", timezone="Asia/Karachi"):
+    """Create a booking on Cal.com.
+
+    Raises ``requests.exceptions.RequestException`` when the booking fails.
+    """
+    payload = build_booking_payload(event_id, name, email, start_time, location, title, description, timezone)
+    response = get_session().post(
+        f"{CALCOM_BASE_URL}/bookings",
+        json=payload,
+        params=QUERYSTRING,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+    )
+    response.raise_for_status()
+    return response.json()
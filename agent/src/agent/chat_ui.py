@@ -0,0 +1,100 @@
+import functools
+import math
+from datetime import datetime
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from agent.booking_queue import QueueFull
+from agent.history import HISTORY_PAGE_SIZE, ChatHistory
+from agent.metrics import timed
+from agent.session_store import session_id
+
+
+@timed("render_history")
+def render_history(history, key="history_page"):
+    """Render the recent messages, with older ones paged inside a collapsed expander."""
+    older = history.older_count()
+    if older:
+        with st.expander(f"Earlier messages ({older})"):
+            pages = math.ceil(older / HISTORY_PAGE_SIZE)
+            page = st.number_input("Page", min_value=1, max_value=pages, value=pages, key=key) if pages > 1 else 1
+            for message in history.older_page(page):
+                with st.chat_message(message.role):
+                    st.write(message.content)
+
+    for message in history.recent():
+        with st.chat_message(message.role):
+            st.write(message.content)
+
+
+def restore_session(store, greeting, keys):
+    """Fill ``st.session_state`` from the shared session store, or start a new chat with ``greeting``.
+
+    ``keys`` are the session-state flags shared with other replicas.
+    """
+    saved = store.load(session_id(st.query_params)) if store is not None else None
+    if saved is not None and saved.messages:
+        st.session_state.messages = saved.history()
+        for key in keys:
+            if key in saved.fields:
+                st.session_state[key] = saved.fields[key]
+    else:
+        st.session_state.messages = ChatHistory([{"role": "assistant", "content": greeting}])
+
+
+@timed("save_session")
+def save_session(store, keys):
+    """Write this rerun's new messages and changed flags to the shared session store."""
+    if store is not None and "messages" in st.session_state:
+        store.save(session_id(st.query_params), st.session_state.messages, {key: st.session_state.get(key) for key in keys})
+
+
+def saves_session(get_store, keys):
+    """Save the session after every run of the decorated fragment.
+
+    A fragment rerun executes the fragment alone, so the save at the end
+    of the script never runs for it.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            try:
+                return function(*args, **kwargs)
+            finally:
+                save_session(get_store(), keys)
+        return wrapper
+    return decorate
+
+
+def queue_booking(runtime, event_type, name, email, start_time, location, title, description, timezone):
+    """Queue a booking and keep its ticket in ``pending_booking`` for the app's status fragment.
+
+    Returns ``None`` once queued, or the message to show when the start time
+    is malformed or the queue is full.
+    """
+    try:
+        ticket = runtime.pipeline.submit(event_type.id, name, email, start_time, location, title, description, timezone)
+    except ValueError:
+        return "Invalid date or time."
+    except QueueFull as e:
+        return str(e)
+    start = datetime.fromisoformat(start_time)
+    st.session_state.pending_booking = {
+        "ticket": ticket,
+        "name": name,
+        "email": email,
+        "date": start.date(),
+        "time": start.strftime('%H:%M:%S'),
+        "offset": start_time[-6:],
+        "location": location,
+        "title": title,
+    }
+    st.session_state.pop("booking_details", None)
+    return None
+
+
+def rerun_pane():
+    """Rerun only the calling fragment, or the whole app when it ran as part of a full rerun."""
+    ctx = get_script_run_ctx()
+    st.rerun(scope="fragment" if ctx is not None and ctx.fragment_ids_this_run else "app")
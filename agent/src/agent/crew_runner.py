@@ -0,0 +1,235 @@
+"""Run crews defined in crewai-style YAML, without crewai's Crew machinery.
+
+A crew directory holds ``agents.yaml`` and ``tasks.yaml`` in the format
+crewai uses (``role``/``goal``/``backstory``/``llm``; ``description``/
+``expected_output``/``agent``/``context``)::
+
+    class PoemCrew(Crew):
+        config_dir = Path(__file__).parent / "config"
+
+    PoemCrew().kickoff({"sentence_count": 3}).raw
+    PoemCrew().crew().kickoff(inputs={"sentence_count": 3}).raw  # crewai's spelling
+
+Each task is one model call, so agents cannot use tools; a config that
+gives an agent or task ``tools`` is rejected rather than run without them.
+
+- The YAML is parsed once per process, however often a crew is built.
+- ``process = "sequential"`` (the default) runs tasks in file order and, as
+  in crewai, hands a task without ``context`` every earlier answer.
+  ``process = "concurrent"`` only waits for the tasks named in ``context``;
+  the others in the same wave run concurrently on a shared thread pool.
+- Each task's answer is memoized on disk, keyed on the model and the
+  fully rendered prompt, so the same inputs are never sent twice. The
+  cache lives in ``CREW_CACHE_DIR``, readable only by its owner; crews
+  whose inputs hold personal details set ``cache = False``.
+- Every task and crew run is recorded with ``metrics.trace`` instead of
+  verbose console output.
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+from agent.cache import DiskCache
+from agent.llm import complete
+from agent.metrics import observe, trace
+
+CREW_MODEL = os.getenv("CREW_MODEL", "gemini/gemini-2.0-flash")
+CREW_WORKERS = int(os.getenv("CREW_WORKERS", "8"))
+CREW_CACHE_DIR = os.getenv("CREW_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "agent", "crews"))
+CREW_CACHE_MAX_BYTES = int(os.getenv("CREW_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def render(template, inputs):
+    """Fill ``{name}`` placeholders from ``inputs``; other braces are left alone."""
+    return _PLACEHOLDER.sub(
+        lambda match: str(inputs[match.group(1)]) if match.group(1) in inputs else match.group(0),
+        template,
+    ).strip()
+
+
+class CrewConfig:
+    """Parsed agents and tasks of one crew, with its tasks grouped into waves."""
+
+    def __init__(self, name, agents, tasks):
+        for item_name, item in (*agents.items(), *tasks.items()):
+            if item.get("tools"):
+                raise ValueError(f"{item_name!r} uses tools, which crew_runner cannot run; use crewai for this crew")
+        for task_name, task in tasks.items():
+            if task.get("agent") not in agents:
+                raise ValueError(f"task {task_name!r} names unknown agent {task.get('agent')!r}")
+            unknown = set(task.get("context") or ()) - set(tasks)
+            if unknown:
+                raise ValueError(f"task {task_name!r} has unknown context {sorted(unknown)}")
+        self.name = name
+        self.agents = agents
+        self.tasks = tasks
+        self.waves = _waves(tasks)
+
+
+def _waves(tasks):
+    """Group tasks so each only depends on earlier groups, keeping file order."""
+    done, waves = set(), []
+    remaining = list(tasks)
+    while remaining:
+        wave = [name for name in remaining if set(tasks[name].get("context") or ()) <= done]
+        if not wave:
+            raise ValueError(f"tasks {remaining} depend on each other in a cycle")
+        waves.append(tuple(wave))
+        done.update(wave)
+        remaining = [name for name in remaining if name not in done]
+    return tuple(waves)
+
+
+@lru_cache(maxsize=None)
+def load_crew_config(config_dir):
+    config_dir = Path(config_dir)
+    with open(config_dir / "agents.yaml", encoding="utf-8") as f:
+        agents = yaml.safe_load(f)
+    with open(config_dir / "tasks.yaml", encoding="utf-8") as f:
+        tasks = yaml.safe_load(f)
+    name = config_dir.parent.name if config_dir.name == "config" else config_dir.name
+    return CrewConfig(name, agents, tasks)
+
+
+def task_messages(agent, task, inputs, context=()):
+    """The chat messages that ask ``agent`` to do ``task``."""
+    system = (
+        f"You are {render(agent['role'], inputs)}. {render(agent.get('backstory', ''), inputs)}\n"
+        f"Your personal goal is: {render(agent.get('goal', ''), inputs)}"
+    )
+    prompt = (
+        f"{render(task['description'], inputs)}\n\n"
+        f"This is the expected criteria for your final answer: {render(task.get('expected_output', ''), inputs)}"
+    )
+    if context:
+        prompt += "\n\nThis is the context you're working with:\n" + "\n\n".join(context)
+    return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+
+
+class CrewOutput:
+    """Every task's answer, with ``raw`` the answer of the last task."""
+
+    def __init__(self, tasks, last):
+        self.tasks = tasks
+        self.raw = tasks[last]
+
+    def __str__(self):
+        return self.raw
+
+    def json(self, task=None):
+        """Parse the JSON object in a task's answer (default the last), ignoring code fences around it.
+
+        Raises ``ValueError`` when there is none.
+        """
+        text = self.tasks[task] if task else self.raw
+        match = _JSON_OBJECT.search(text)
+        if match is None:
+            raise ValueError(f"no JSON object in {text[:80]!r}")
+        return json.loads(match.group(0))
+
+
+class Crew:
+    """A YAML-defined crew; subclasses set ``config_dir``."""
+
+    config_dir = None
+    model = CREW_MODEL
+    process = "sequential"
+    cache = True
+
+    def __init__(self, config_dir=None, model=None):
+        if self.process not in ("sequential", "concurrent"):
+            raise ValueError(f"unknown process {self.process!r}")
+        self.config = load_crew_config(str(config_dir or self.config_dir))
+        self.model = model or self.model
+        if self.process == "sequential":
+            self.waves = tuple((name,) for name in self.config.tasks)
+        else:
+            self.waves = self.config.waves
+
+    def crew(self):
+        """This crew, for code written against crewai's ``@CrewBase`` classes."""
+        return self
+
+    def kickoff(self, inputs=None):
+        """Run every task and return a ``CrewOutput``."""
+        inputs = dict(inputs or {})
+        run = uuid.uuid4().hex[:12]
+        outputs = {}
+        started = time.perf_counter()
+        for wave in self.waves:
+            if len(wave) == 1:
+                outputs[wave[0]] = self.run_task(wave[0], inputs, outputs, run)
+            else:
+                futures = [(name, get_executor().submit(self.run_task, name, inputs, outputs, run)) for name in wave]
+                for name, future in futures:
+                    outputs[name] = future.result()
+        seconds = time.perf_counter() - started
+        observe("crew_kickoff", seconds)
+        trace("crew", crew=self.config.name, run=run, tasks=len(outputs), seconds=round(seconds, 4))
+        return CrewOutput(outputs, self.waves[-1][-1])
+
+    def run_task(self, name, inputs, outputs=None, run=None):
+        """Answer one task, from the disk cache when these exact messages were sent before."""
+        task = self.config.tasks[name]
+        outputs = outputs or {}
+        if "context" in task or self.process != "sequential":
+            context = [outputs[dependency] for dependency in task.get("context") or ()]
+        else:
+            context = list(outputs.values())
+        agent = self.config.agents[task["agent"]]
+        model = agent.get("llm") or self.model
+        messages = task_messages(agent, task, inputs, context)
+        cache = get_cache() if self.cache else None
+        key = json.dumps([model, messages])
+        started = time.perf_counter()
+        text = cache.get(key) if cache is not None else None
+        cached = text is not None
+        try:
+            if not cached:
+                text = complete(model, messages, os.getenv("GEMINI_API_KEY"))
+                if cache is not None:
+                    cache.set(key, text)
+        except Exception as e:
+            trace("crew_task", crew=self.config.name, task=name, run=run, error=type(e).__name__)
+            raise
+        seconds = time.perf_counter() - started
+        observe("crew_task", seconds)
+        trace("crew_task", crew=self.config.name, task=name, agent=task["agent"], run=run,
+              cached=cached, seconds=round(seconds, 4), chars=len(text))
+        return text
+
+
+_executor = None
+_cache = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """The thread pool shared by every crew in the process."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=CREW_WORKERS, thread_name_prefix="crew")
+    return _executor
+
+
+def get_cache():
+    """The on-disk task cache, or None when ``CREW_CACHE_MAX_BYTES`` is 0."""
+    global _cache
+    if _cache is None and CREW_CACHE_MAX_BYTES > 0:
+        with _lock:
+            if _cache is None:
+                _cache = DiskCache(CREW_CACHE_DIR, CREW_CACHE_MAX_BYTES)
+    return _cache
@@ -1,47 +1,17 @@
-from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from pathlib import Path
 
-# If you want to run a snippet of code before or after the crew starts,
-# you can use the @before_kickoff and @after_kickoff decorators
-# https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
+from agent.crew_runner import Crew
 
 
-@CrewBase
-class PoemCrew:
-    """Poem Crew"""
+class PoemCrew(Crew):
+    """Poem Crew
 
-    # Learn more about YAML configuration files here:
-    # Agents: https://docs.crewai.com/concepts/agents#yaml-configuration-recommended
-    # Tasks: https://docs.crewai.com/concepts/tasks#yaml-configuration-recommended
-    agents_config = "config/agents.yaml"
-    tasks_config = "config/tasks.yaml"
+    Agents and tasks are defined in ``config/agents.yaml`` and
+    ``config/tasks.yaml``, which are parsed once per process::
 
-    # If you would lik to add tools to your crew, you can learn more about it here:
-    # https://docs.crewai.com/concepts/agents#agent-tools
-    @agent
-    def poem_writer(self) -> Agent:
-        return Agent(
-            config=self.agents_config["poem_writer"],
-        )
+        PoemCrew().kickoff({"sentence_count": 3}).raw
 
-    # To learn more about structured task outputs,
-    # task dependencies, and task callbacks, check out the documentation:
-    # https://docs.crewai.com/concepts/tasks#overview-of-a-task
-    @task
-    def write_poem(self) -> Task:
-        return Task(
-            config=self.tasks_config["write_poem"],
-        )
+    ``PoemCrew().crew().kickoff(inputs=...)``, as written for crewai, still works.
+    """
 
-    @crew
-    def crew(self) -> Crew:
-        """Creates the Research Crew"""
-        # To learn how to add knowledge sources to your crew, check out the documentation:
-        # https://docs.crewai.com/concepts/knowledge#what-is-knowledge
-
-        return Crew(
-            agents=self.agents,  # Automatically created by the @agent decorator
-            tasks=self.tasks,  # Automatically created by the @task decorator
-            process=Process.sequential,
-            verbose=True,
-        )
+    config_dir = Path(__file__).parent / "config"
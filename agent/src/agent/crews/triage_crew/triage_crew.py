@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from agent.crew_runner import Crew
+from agent.event_types import get_registry
+
+
+class TriageCrew(Crew):
+    """Triage Crew
+
+    Classifies a visitor's message and, at the same time, picks the meeting
+    type and writes a one-line summary of it for the team.
+    """
+
+    config_dir = Path(__file__).parent / "config"
+    # The two tasks are independent, so ask both at once.
+    process = "concurrent"
+    # Messages carry names and email addresses; keep them off the disk.
+    cache = False
+
+
+def triage(message, registry=None):
+    """Return ``{"category", "urgency", "event_type", "summary"}`` for a message.
+
+    Raises ``ValueError`` when an answer is not the JSON asked for.
+    """
+    registry = registry or get_registry()
+    output = TriageCrew().kickoff({"message": message, "event_types": ", ".join(event_type.slug for event_type in registry)})
+    return {**output.json("classify_request"), **output.json("extract_details")}
@@ -0,0 +1,89 @@
+"""Precompiled dispatch for crewai flows.
+
+``Flow.kickoff()`` starts an event loop, emits start/finish events with a
+copy of the state for every method, and scans every listener's
+conditions after each step to find the next one. A flow whose graph
+never changes can instead be resolved once into lookup tables and run
+step by step with plain calls::
+
+    output = compile_flow(type(flow)).run(flow)
+
+Execution order follows crewai's: after a method, the routers listening to
+it run first, in order, and the chain continues on the last router's route.
+Then the listeners of the method and of every route returned run, each
+given the triggering method's result if it takes a parameter. Only
+``or``-style conditions, synchronous methods and unconditional start
+methods are supported. Nothing may listen to a router by name either:
+crewai then routes on that listener's output rather than the router's.
+``compile_flow`` raises ``ValueError`` for anything else.
+"""
+import asyncio
+import inspect
+from functools import lru_cache
+
+
+class FlowDispatch:
+    """A flow class's start, router and listener graph as lookup tables."""
+
+    def __init__(self, flow_class):
+        self.start = tuple(flow_class._start_methods)
+        self.functions = {}
+        self.takes_result = {}
+        self.routers = {}
+        self.listeners = {}
+        for name, (condition, triggers) in flow_class._listeners.items():
+            if condition != "OR":
+                raise ValueError(f"{flow_class.__name__}.{name} uses an {condition} condition")
+            if name in self.start:
+                raise ValueError(f"{flow_class.__name__}.{name} is a start method with a trigger")
+            table = self.routers if name in flow_class._routers else self.listeners
+            for trigger in triggers:
+                table.setdefault(trigger, []).append(name)
+        for name in {*self.start, *flow_class._listeners}:
+            function = getattr(flow_class, name)
+            if asyncio.iscoroutinefunction(function):
+                raise ValueError(f"{flow_class.__name__}.{name} is async")
+            self.functions[name] = function
+            self.takes_result[name] = len(inspect.signature(function).parameters) > 1
+        for name in flow_class._routers:
+            if name in self.routers or name in self.listeners:
+                raise ValueError(f"{flow_class.__name__}.{name} is a router that other methods listen to")
+        self.routers = {trigger: tuple(names) for trigger, names in self.routers.items()}
+        self.listeners = {trigger: tuple(names) for trigger, names in self.listeners.items()}
+
+    def _call(self, flow, name, result):
+        function = self.functions[name]
+        return function(flow, result) if self.takes_result[name] else function(flow)
+
+    def run(self, flow):
+        """Run one pass of the graph on ``flow``; returns the last method's output."""
+        outputs = []
+        for name in self.start:
+            output = self._call(flow, name, None)
+            outputs.append(output)
+            self._after(flow, name, output, outputs)
+        return outputs[-1] if outputs else None
+
+    def _after(self, flow, name, result, outputs):
+        triggers = [name]
+        current = name
+        while current in self.routers:
+            for router in self.routers[current]:
+                route = self._call(flow, router, result)
+                outputs.append(route)
+                if route:
+                    triggers.append(str(route))
+            if route is None:
+                break
+            current = str(route)
+        for trigger in triggers:
+            for listener in self.listeners.get(trigger, ()):
+                output = self._call(flow, listener, result)
+                outputs.append(output)
+                self._after(flow, listener, output, outputs)
+
+
+@lru_cache(maxsize=None)
+def compile_flow(flow_class):
+    """The ``FlowDispatch`` for ``flow_class``, built once per process."""
+    return FlowDispatch(flow_class)
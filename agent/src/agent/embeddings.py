@@ -0,0 +1,45 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+EMBED_DIM = int(os.getenv("EMBED_DIM", "1024"))
+
+_WORD = re.compile(r"\w+")
+
+
+def _features(text):
+    words = _WORD.findall(text.lower())
+    for word in words:
+        yield "w:" + word
+        padded = f" {word} "
+        for n in (3, 4):
+            for i in range(len(padded) - n + 1):
+                yield padded[i:i + n]
+    for first, second in zip(words, words[1:]):
+        yield f"b:{first} {second}"
+
+
+def embed(text, dim=EMBED_DIM):
+    """Embed text as an L2-normalised vector of hashed word and character n-grams.
+
+    Runs on CPU with no model download; crc32 keeps the hashing stable across
+    processes, unlike the salted built-in ``hash``.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in _features(text):
+        code = zlib.crc32(feature.encode("utf-8"))
+        vector[code % dim] += 1.0 if code & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+def embed_many(texts, dim=EMBED_DIM):
+    """Embed several texts into a ``(len(texts), dim)`` float32 matrix."""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        matrix[row] = embed(text, dim)
+    return matrix
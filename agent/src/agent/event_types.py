@@ -0,0 +1,163 @@
+"""Registry of the Cal.com event types we book.
+
+Loaded from ``config/event_types.yaml``, whose slugs are the only event
+types ever offered; their ids, titles and lengths are refreshed in bulk
+from Cal.com's ``/event-types`` endpoint every ``EVENT_TYPES_REFRESH`` seconds. Refreshes
+run in the background and swap in a new registry, so a booking never waits
+on an event-type lookup.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+import yaml
+
+from agent.routing import KeywordRouter
+
+EVENT_TYPES_CONFIG = Path(__file__).parent / "config" / "event_types.yaml"
+EVENT_TYPES_REFRESH = float(os.getenv("EVENT_TYPES_REFRESH", "3600"))
+EVENT_TYPES_RETRY_AFTER = float(os.getenv("EVENT_TYPES_RETRY_AFTER", "60"))
+EVENT_TYPES_SYNC = os.getenv("EVENT_TYPES_SYNC", "1") == "1"
+
+
+class EventType:
+    """One bookable event type; ``length`` is the meeting length in minutes."""
+
+    __slots__ = ("id", "slug", "title", "length", "keywords")
+
+    def __init__(self, id, slug, title, length=60, keywords=()):
+        self.id = int(id)
+        self.slug = slug
+        self.title = title
+        self.length = int(length)
+        self.keywords = tuple(keywords)
+
+    def __repr__(self):
+        return f"EventType({self.slug!r}, id={self.id}, length={self.length})"
+
+
+class EventTypeRegistry:
+    """Event types indexed by slug, by id and by keyword."""
+
+    def __init__(self, event_types, default=None):
+        if not event_types:
+            raise ValueError("an event-type registry needs at least one event type")
+        self.by_slug = {event_type.slug: event_type for event_type in event_types}
+        self.by_id = {event_type.id: event_type for event_type in event_types}
+        self.default = self.by_slug.get(default) or event_types[0]
+        # A slug such as "product-demo" is a keyword of its own event type.
+        self.router = KeywordRouter(
+            {event_type.slug: (event_type.slug.replace("-", " "), *event_type.keywords) for event_type in event_types},
+            default=None,
+        )
+
+    def __iter__(self):
+        return iter(self.by_slug.values())
+
+    def __len__(self):
+        return len(self.by_slug)
+
+    def get(self, slug):
+        return self.by_slug.get(slug, self.default)
+
+    def for_id(self, event_id):
+        return self.by_id.get(int(event_id), self.default)
+
+    def match(self, text):
+        """The event type a message asks for, or the default."""
+        return self.get(self.router.route(text)) if text else self.default
+
+    def merged(self, remote):
+        """This registry with ids, titles and lengths refreshed from Cal.com's answer.
+
+        Other event types on the account are ignored. Ours that Cal.com no
+        longer lists, or lists as hidden, are left out, except the default,
+        which is kept as it is; an empty answer keeps this registry.
+        """
+        if not remote:
+            return self
+        listed = {item["slug"]: item for item in remote if not item.get("hidden")}
+        event_types = []
+        for event_type in self:
+            item = listed.get(event_type.slug)
+            if item is not None:
+                event_types.append(EventType(
+                    item["id"], event_type.slug, item.get("title") or event_type.title,
+                    item.get("length") or event_type.length, event_type.keywords,
+                ))
+            elif event_type is self.default:
+                event_types.append(event_type)
+        return EventTypeRegistry(event_types, self.default.slug)
+
+    @classmethod
+    def from_config(cls, path=EVENT_TYPES_CONFIG):
+        with open(path, encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        event_types = [
+            EventType(settings["id"], slug, settings.get("title", slug), settings.get("length", 60), settings.get("keywords") or ())
+            for slug, settings in config["event_types"].items()
+        ]
+        return cls(event_types, config.get("default"))
+
+
+def fetch_event_types():
+    """All event types on the Cal.com account, as returned by ``GET /event-types``.
+
+    Raises ``requests.exceptions.RequestException`` on failure.
+    """
+    from agent.calcom import CALCOM_BASE_URL, CONNECT_TIMEOUT, QUERYSTRING, READ_TIMEOUT, get_session
+
+    response = get_session().get(
+        f"{CALCOM_BASE_URL}/event-types",
+        params=QUERYSTRING,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+    )
+    response.raise_for_status()
+    return response.json().get("event_types", [])
+
+
+_config = None
+_registry = None
+_registry_lock = threading.Lock()
+_next_sync = 0.0
+_syncing = False
+
+
+def sync_event_types():
+    """Refresh the registry from Cal.com now; returns the registry in use afterwards."""
+    global _registry, _next_sync, _syncing
+    registry = get_registry(refresh=False)
+    synced = False
+    try:
+        registry = _config.merged(fetch_event_types())
+        synced = True
+    except (requests.exceptions.RequestException, KeyError, ValueError):
+        pass
+    finally:
+        with _registry_lock:
+            if synced:
+                _registry = registry
+                _next_sync = time.monotonic() + EVENT_TYPES_REFRESH
+            else:
+                # Keep serving what we have and try again shortly.
+                _next_sync = time.monotonic() + EVENT_TYPES_RETRY_AFTER
+            _syncing = False
+    return registry
+
+
+def get_registry(refresh=EVENT_TYPES_SYNC):
+    """Return the current registry, starting a background refresh when it is due."""
+    global _config, _registry, _syncing
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _config = _registry = EventTypeRegistry.from_config()
+    if refresh and not _syncing and time.monotonic() >= _next_sync:
+        with _registry_lock:
+            if _syncing:
+                return _registry
+            _syncing = True
+        threading.Thread(target=sync_event_types, name="event-types-sync", daemon=True).start()
+    return _registry
@@ -0,0 +1,278 @@
+"""Local extraction of booking details from chat messages.
+
+``extract_booking("book me Tuesday 3pm online, jane@x.com")`` picks out
+the name, email, start time and location with regular expressions and
+python-dateutil, without calling the LLM, so a request that names
+everything can be booked in one turn and a partial one can pre-fill the
+form. Times are read in the IANA zone named in the message, if any, else
+in the zone passed in.
+"""
+import os
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from dateutil import parser
+from dateutil.relativedelta import FR, MO, SA, SU, TH, TU, WE, relativedelta
+
+from agent.timezones import BUSINESS_TIMEZONE, get_zone, to_iso
+
+DATE_DAYFIRST = os.getenv("DATE_DAYFIRST", "true").lower() in ("1", "true", "yes")
+# A bare "at 3" or "3:30" before this hour means the afternoon; "03:30" does not.
+AFTERNOON_BEFORE = 8
+
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+ZONE = re.compile(r"\b[A-Z][A-Za-z_]+(?:/[A-Z][A-Za-z_-]+)+\b|\bUTC\b")
+
+_MONTHS = r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+# Dates that need dateutil: "March 3", "3rd of March 2026".
+TEXT_DATES = (
+    re.compile(rf"\b(?:{_MONTHS})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?\b(?:,?\s+\d{{4}}\b)?", re.I),
+    re.compile(rf"\b\d{{1,2}}(?:st|nd|rd|th)?(?:\s+of)?\s+(?:{_MONTHS})\b\.?(?:,?\s+\d{{4}}\b)?", re.I),
+)
+# "3/4", "03/04/25"; read day first unless DATE_DAYFIRST is off or only the other order is valid.
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}(?:\d{2})?))?\b")
+# "the 20th": this month's, or next month's once it has passed.
+ORDINAL_DATE = re.compile(r"\bthe\s+(\d{1,2})(?:st|nd|rd|th)\b", re.I)
+RELATIVE_DATE = re.compile(
+    r"\b(?:(day after tomorrow)|(today)|(tomorrow)|in\s+(\d{1,2})\s+days?"
+    r"|(?:(this|next|on)\s+)?(monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tues?|weds?|thu(?:rs?)?|fri)\b)\b",
+    re.I,
+)
+
+# Dates too vague or malformed to book: "next month", "in March", "2026-02-30".
+# "May I ..." is a question, not the month.
+_MONTH_WORD = _MONTHS.replace("|may|", r"|may(?!\s+(?:i|we|you)\b)|")
+VAGUE_DATE = re.compile(
+    rf"\b(?:(?:next|this|coming)\s+(?:week|month|year)|{_MONTH_WORD}|\d{{4}}-\d{{1,2}}-\d{{1,2}})\b",
+    re.I,
+)
+WEEKDAYS = {"mon": MO, "tue": TU, "wed": WE, "thu": TH, "fri": FR, "sat": SA, "sun": SU}
+
+TIME_AMPM = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*([ap])\.?m\b\.?", re.I)
+TIME_24H = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+TIME_AT = re.compile(r"\bat\s+(\d{1,2})(?:\s*o'?clock)?\b(?![:/.]\d)", re.I)
+NOON = re.compile(r"\b(?:noon|midday)\b", re.I)
+
+# Checked in order; the first that matches wins.
+LOCATIONS = (
+    ("inPerson", re.compile(r"\b(?:in[- ]person|face[- ]to[- ]face|on[- ]?site|at (?:your|the) office|in the office)\b", re.I)),
+    ("online", re.compile(r"\b(?:online|zoom|video|virtual(?:ly)?|google meet|teams|remote(?:ly)?)\b", re.I)),
+    ("phone", re.compile(r"\b(?:phone|telephone|by call|call me|ring me)\b", re.I)),
+)
+
+_NAME = r"((?:(?:Dr|Mr|Mrs|Ms|Prof)\.?\s+)?[A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+)?)"
+NAME_INTRO = re.compile(rf"(?i:\b(?:my name is|name is|name:|this is|i am|i'm|i’m)\s+){_NAME}")
+NAME_BEFORE_EMAIL = re.compile(rf"{_NAME}\s*[,:<(-]?\s*<?[\w.+-]+@")
+# Capitalised words that precede an email or follow "this is" but are not names.
+NOT_NAMES = {
+    "book", "booking", "please", "thanks", "thank", "regards", "cheers", "hi", "hello", "hey",
+    "email", "mail", "contact", "reach", "me", "at", "online", "phone", "today", "tomorrow",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "utc",
+}
+# Mailbox names that say nothing about the sender.
+ROLE_MAILBOXES = {"info", "admin", "contact", "hello", "sales", "office", "support", "team", "mail", "noreply", "user"}
+
+
+class BookingDetails:
+    """What a message says about a booking; fields it does not mention are None."""
+
+    __slots__ = ("name", "email", "day", "start_time", "location", "timezone")
+
+    def __init__(self, name=None, email=None, day=None, start_time=None, location=None, timezone=BUSINESS_TIMEZONE):
+        self.name = name
+        self.email = email
+        self.day = day
+        self.start_time = start_time
+        self.location = location
+        self.timezone = timezone
+
+    @property
+    def complete(self):
+        """True when the booking can be made without asking anything else."""
+        return bool(self.name and self.email and self.start_time)
+
+    @property
+    def found(self):
+        return any((self.name, self.email, self.day, self.start_time, self.location))
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__ if getattr(self, field) is not None)
+        return f"BookingDetails({fields})"
+
+
+def _mask(text, match):
+    # Blank out a match so later patterns cannot reuse its digits.
+    return text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+
+
+@lru_cache(maxsize=1024)
+def _parse_date(text, year, month):
+    # Phrases like "March 14" repeat across messages; dateutil is the slow part.
+    return parser.parse(text, default=datetime(year, month, 1), fuzzy=True, dayfirst=DATE_DAYFIRST).date()
+
+
+def _find_date(text, today):
+    """Return ``(day, text)`` with the first date in ``text`` masked, or ``(None, text)``.
+
+    ``day`` is False when the text names a date that cannot be read, such
+    as "next month" or "2026-02-30", so callers do not assume today.
+    """
+    match = ISO_DATE.search(text)
+    if match:
+        try:
+            return date(*map(int, match.groups())), _mask(text, match)
+        except ValueError:
+            return False, _mask(text, match)
+    for pattern in TEXT_DATES:
+        match = pattern.search(text)
+        if match:
+            try:
+                day = _parse_date(match.group(), today.year, today.month)
+            except (ValueError, OverflowError):
+                return False, _mask(text, match)
+            if day < today and not re.search(r"\d{4}\b", match.group()):
+                # No year given and the date has passed: the next one is meant.
+                day += relativedelta(years=1)
+            return day, _mask(text, match)
+    match = NUMERIC_DATE.search(text)
+    if match:
+        first, second, year = match.groups()
+        year = int(year) + (2000 if len(year) == 2 else 0) if year else today.year
+        orders = ((first, second), (second, first)) if DATE_DAYFIRST else ((second, first), (first, second))
+        for day_part, month_part in orders:
+            try:
+                day = date(year, int(month_part), int(day_part))
+            except ValueError:
+                continue
+            if day < today and not match.group(3):
+                day += relativedelta(years=1)
+            return day, _mask(text, match)
+        return False, _mask(text, match)
+    match = ORDINAL_DATE.search(text)
+    if match:
+        day = today.replace(day=1) + relativedelta(day=int(match.group(1)))
+        if day < today:
+            day = today.replace(day=1) + relativedelta(months=1, day=int(match.group(1)))
+        return day, _mask(text, match)
+    match = RELATIVE_DATE.search(text)
+    if match:
+        after_tomorrow, on_today, tomorrow, in_days, qualifier, weekday = match.groups()
+        if after_tomorrow:
+            day = today + timedelta(days=2)
+        elif on_today:
+            day = today
+        elif tomorrow:
+            day = today + timedelta(days=1)
+        elif in_days:
+            day = today + timedelta(days=int(in_days))
+        else:
+            target = WEEKDAYS[weekday[:3].lower()]
+            # "this Friday" may be today; "Friday" and "next Friday" never are.
+            day = today + relativedelta(days=0 if (qualifier or "").lower() == "this" else 1, weekday=target(+1))
+        return day, _mask(text, match)
+    match = VAGUE_DATE.search(text)
+    if match:
+        return False, _mask(text, match)
+    return None, text
+
+
+def _afternoon(hour):
+    return hour + 12 if 0 < hour < AFTERNOON_BEFORE else hour
+
+
+def _find_time(text):
+    """The first clock time in ``text``, or None."""
+    match = TIME_AMPM.search(text)
+    if match:
+        hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3).lower()
+        if 1 <= hour <= 12 and minute < 60:
+            return time(hour % 12 + (12 if meridiem == "p" else 0), minute)
+    match = TIME_24H.search(text)
+    if match:
+        hour = match.group(1)
+        return time(int(hour) if len(hour) == 2 else _afternoon(int(hour)), int(match.group(2)))
+    if NOON.search(text):
+        return time(12)
+    match = TIME_AT.search(text)
+    if match and int(match.group(1)) <= 12:
+        return time(_afternoon(int(match.group(1))) % 24)
+    return None
+
+
+def parse_when(text, tz_name=BUSINESS_TIMEZONE, now=None, day=None):
+    """Read a date and clock time from ``text`` as ``(day, clock)``; either may be None.
+
+    ``day`` is used when the text names no date; failing that, a bare time
+    means its next occurrence after ``now`` in ``tz_name``. A date the text
+    names but that cannot be read leaves ``day`` None.
+    """
+    now = now or datetime.now(get_zone(tz_name))
+    found, text = _find_date(text, now.date())
+    clock = _find_time(text)
+    if found is False:
+        return None, clock
+    day = found or day
+    if day is None and clock is not None:
+        day = now.date() if clock > now.time() else now.date() + timedelta(days=1)
+    return day, clock
+
+
+def _find_name(message, email):
+    for pattern in (NAME_INTRO, NAME_BEFORE_EMAIL):
+        for match in pattern.finditer(message):
+            words = [word for word in match.group(1).split() if word.lower() not in NOT_NAMES]
+            if words:
+                return " ".join(words)
+    if email:
+        # jane.doe@x.com -> Jane Doe
+        parts = [part for part in re.split(r"[._-]+", re.sub(r"\d+", "", email.split("@")[0].split("+")[0])) if len(part) > 1]
+        if parts and parts[0].lower() not in ROLE_MAILBOXES:
+            return " ".join(part.capitalize() for part in parts)
+    return None
+
+
+def extract_booking(message, tz_name=BUSINESS_TIMEZONE, now=None):
+    """Pull whatever booking details ``message`` contains into a ``BookingDetails``.
+
+    ``now`` (an aware datetime) anchors relative dates such as "tomorrow".
+    """
+    details = BookingDetails(timezone=tz_name)
+    text = named = message
+
+    match = EMAIL.search(text)
+    if match:
+        details.email = match.group().rstrip(".")
+        text = _mask(text, match)
+
+    for match in ZONE.finditer(text):
+        try:
+            get_zone(match.group())
+        except ValueError:
+            continue
+        details.timezone = match.group()
+        # "Europe/London" must not be read as a name either.
+        text, named = _mask(text, match), _mask(named, match)
+        break
+
+    day, clock = parse_when(text, details.timezone, now.astimezone(get_zone(details.timezone)) if now else None)
+    details.day = day
+    if day is not None and clock is not None:
+        try:
+            details.start_time = to_iso(day, clock, details.timezone)
+        except ValueError:
+            pass  # a wall-clock time the DST change skips
+
+    for location, pattern in LOCATIONS:
+        if pattern.search(text):
+            details.location = location
+            break
+
+    details.name = _find_name(named, details.email)
+    return details
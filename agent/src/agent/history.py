@@ -0,0 +1,86 @@
+import os
+
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "30"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_MAX_CHARS = int(os.getenv("HISTORY_MAX_CHARS", "200000"))
+
+
+class Message:
+    """A single chat message; indexable like the dicts it replaces.
+
+    ``tokens`` and ``summary`` are filled in once by ``agent.prompting`` the
+    first time the message is used as LLM context.
+    """
+
+    __slots__ = ("role", "content", "tokens", "summary")
+
+    def __init__(self, role, content):
+        self.role = role
+        self.content = content
+        self.tokens = None
+        self.summary = None
+
+    def __getitem__(self, key):
+        if key not in ("role", "content"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"Message({self.role!r}, {self.content!r})"
+
+
+class ChatHistory:
+    """Per-session chat history with a render window and a memory cap.
+
+    Only the last ``window`` messages are rendered by default. Once the total
+    content exceeds ``max_chars`` the oldest messages after the greeting are
+    dropped.
+    """
+
+    def __init__(self, messages=(), window=HISTORY_WINDOW, max_chars=HISTORY_MAX_CHARS):
+        self.window = window
+        self.max_chars = max_chars
+        self.messages = []
+        self.chars = 0
+        self.dropped = 0
+        for message in messages:
+            self.append(message)
+
+    def append(self, message):
+        """Add a message, given as a ``Message`` or a ``{"role", "content"}`` dict."""
+        if not isinstance(message, Message):
+            message = Message(message["role"], message["content"])
+        self.messages.append(message)
+        self.chars += len(message.content)
+        self._enforce_cap()
+
+    def _enforce_cap(self):
+        # Keep the greeting and the newest message whatever their size.
+        drop = 0
+        while self.chars > self.max_chars and len(self.messages) - drop > 2:
+            drop += 1
+            self.chars -= len(self.messages[drop].content)
+        if drop:
+            del self.messages[1:drop + 1]
+            self.dropped += drop
+
+    def recent(self):
+        """The messages inside the render window."""
+        return self.messages[-self.window:]
+
+    def older_count(self):
+        return max(0, len(self.messages) - self.window)
+
+    def older_page(self, page, page_size=HISTORY_PAGE_SIZE):
+        """One page of the messages before the window; page 1 is the oldest."""
+        older = self.messages[:self.older_count()]
+        return older[(page - 1) * page_size:page * page_size]
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __getitem__(self, index):
+        return self.messages[index]
@@ -0,0 +1,124 @@
+"""Local intent classifier that answers canned intents without calling the LLM.
+
+Retrain after editing ``config/intents.jsonl`` with::
+
+    python -m agent.intents train
+
+The trained model goes to ``INTENT_MODEL`` (``~/.cache/agent/intent_model.npz``
+by default), not into the package.
+"""
+import json
+import os
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from agent.embeddings import EMBED_DIM, embed, embed_many
+from agent.routing import load_config
+
+CONFIG_DIR = Path(__file__).parent / "config"
+INTENTS_DATA = CONFIG_DIR / "intents.jsonl"
+INTENTS_CONFIG = CONFIG_DIR / "intents.yaml"
+INTENT_MODEL = Path(os.getenv("INTENT_MODEL", os.path.join(os.path.expanduser("~"), ".cache", "agent", "intent_model.npz")))
+ESCALATE = "other"
+
+
+class IntentClassifier:
+    """Softmax regression over hashed n-gram features, stored as NumPy arrays."""
+
+    def __init__(self, labels, weights, bias):
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(cls, texts, intents, epochs=300, learning_rate=1.0, l2=1e-4, dim=EMBED_DIM):
+        labels = sorted(set(intents))
+        features = embed_many(texts, dim)
+        targets = np.zeros((len(texts), len(labels)), dtype=np.float32)
+        targets[np.arange(len(texts)), [labels.index(intent) for intent in intents]] = 1.0
+
+        weights = np.zeros((dim, len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        for _ in range(epochs):
+            probabilities = _softmax(features @ weights + bias)
+            error = (probabilities - targets) / len(texts)
+            weights -= learning_rate * (features.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(labels, weights, bias)
+
+    @classmethod
+    def load(cls, path=INTENT_MODEL):
+        with np.load(path) as model:
+            return cls(model["labels"].tolist(), model["weights"], model["bias"])
+
+    def save(self, path=INTENT_MODEL):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, labels=np.array(self.labels), weights=self.weights, bias=self.bias)
+
+    def predict(self, text):
+        """Return ``(intent, confidence)`` for the most likely intent."""
+        probabilities = _softmax(embed(text, self.weights.shape[0]) @ self.weights + self.bias)
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def load_training_data(path=INTENTS_DATA):
+    rows = [json.loads(line) for line in Path(path).read_text(encoding="utf-8").splitlines() if line.strip()]
+    return [row["text"] for row in rows], [row["intent"] for row in rows]
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier():
+    """Load the saved model, or train one in memory if none has been saved."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                if INTENT_MODEL.exists():
+                    _classifier = IntentClassifier.load(INTENT_MODEL)
+                else:
+                    _classifier = IntentClassifier.train(*load_training_data())
+    return _classifier
+
+
+@lru_cache(maxsize=256)
+def classify_intent(text):
+    """Return a confidently predicted intent, or None to escalate to the LLM."""
+    intent, confidence = get_classifier().predict(text)
+    if intent == ESCALATE or confidence < load_config(INTENTS_CONFIG)["threshold"]:
+        return None
+    return intent
+
+
+def canned_answer(intent):
+    """Return the local answer for an intent, or None if it has none."""
+    answer = load_config(INTENTS_CONFIG)["answers"].get(intent)
+    return answer.strip() if answer else None
+
+
+def main():
+    if sys.argv[1:2] == ["train"]:
+        classifier = IntentClassifier.train(*load_training_data())
+        classifier.save(INTENT_MODEL)
+        print(f"Saved {len(classifier.labels)} intents to {INTENT_MODEL}")
+    else:
+        for text in sys.argv[1:]:
+            intent, confidence = get_classifier().predict(text)
+            print(f"{text!r}: {intent} ({confidence:.2f})")
+
+
+if __name__ == "__main__":
+    main()
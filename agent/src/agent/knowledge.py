@@ -0,0 +1,166 @@
+"""Local knowledge base of our services, searched by embedding similarity.
+
+The Markdown documents in ``config/knowledge`` are split into one chunk per
+``##`` section and embedded once into ``config/knowledge_index``::
+
+    python -m agent.knowledge build
+    python -m agent.knowledge "do you do fertility tracking?"
+
+The index is memory-mapped when loaded: the vectors stay on disk until a
+search touches them, and chunk text is only read for the top hits.
+"""
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from agent.embeddings import EMBED_DIM, embed, embed_many
+
+CONFIG_DIR = Path(__file__).parent / "config"
+KNOWLEDGE_DIR = Path(os.getenv("KNOWLEDGE_DIR", CONFIG_DIR / "knowledge"))
+KNOWLEDGE_INDEX = Path(os.getenv("KNOWLEDGE_INDEX", CONFIG_DIR / "knowledge_index"))
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+KNOWLEDGE_ANSWER_THRESHOLD = float(os.getenv("KNOWLEDGE_ANSWER_THRESHOLD", "0.3"))
+KNOWLEDGE_CONTEXT_THRESHOLD = float(os.getenv("KNOWLEDGE_CONTEXT_THRESHOLD", "0.25"))
+CHUNK_WORDS = 120
+
+_SECTION = re.compile(r"^## +(.+)$", re.MULTILINE)
+
+
+def chunk_document(text):
+    """Yield ``(title, body)`` for each ``##`` section, splitting long ones by paragraph."""
+    heading = re.match(r"# +(.+)", text)
+    document = heading.group(1).strip() if heading else ""
+    parts = _SECTION.split(text)
+    for section, body in zip(parts[1::2], parts[2::2]):
+        title = f"{document}: {section.strip()}" if document else section.strip()
+        chunk = []
+        for paragraph in (p.strip() for p in body.split("\n\n")):
+            if not paragraph:
+                continue
+            if chunk and len(" ".join(chunk + [paragraph]).split()) > CHUNK_WORDS:
+                yield title, "\n\n".join(chunk)
+                chunk = []
+            chunk.append(paragraph)
+        if chunk:
+            yield title, "\n\n".join(chunk)
+
+
+def build_index(source=KNOWLEDGE_DIR, index=KNOWLEDGE_INDEX, dim=EMBED_DIM):
+    """Chunk and embed every document under ``source`` into ``index``; return the chunk count."""
+    titles, texts = [], []
+    for path in sorted(Path(source).glob("*.md")):
+        for title, body in chunk_document(path.read_text(encoding="utf-8")):
+            titles.append(title)
+            texts.append(body)
+
+    index = Path(index)
+    index.mkdir(parents=True, exist_ok=True)
+    encoded = [text.encode("utf-8") for text in texts]
+    ends = np.cumsum([len(data) for data in encoded], dtype=np.int64)
+    offsets = np.stack([ends - [len(data) for data in encoded], ends], axis=1) if encoded else np.zeros((0, 2), np.int64)
+    (index / "chunks.txt").write_bytes(b"".join(encoded))
+    np.save(index / "offsets.npy", offsets)
+    (index / "meta.json").write_text(json.dumps({"dim": dim, "titles": titles}), encoding="utf-8")
+    # Written last: its mtime marks the index as complete and current.
+    np.save(index / "vectors.npy", embed_many([f"{title}\n{text}" for title, text in zip(titles, texts)], dim))
+    return len(texts)
+
+
+def is_stale(source=KNOWLEDGE_DIR, index=KNOWLEDGE_INDEX):
+    vectors = Path(index) / "vectors.npy"
+    if not vectors.exists():
+        return True
+    built = vectors.stat().st_mtime
+    return any(path.stat().st_mtime > built for path in Path(source).glob("*.md"))
+
+
+class KnowledgeBase:
+    """Read-only, memory-mapped view of a built index."""
+
+    def __init__(self, index=KNOWLEDGE_INDEX):
+        index = Path(index)
+        meta = json.loads((index / "meta.json").read_text(encoding="utf-8"))
+        self.dim = meta["dim"]
+        self.titles = meta["titles"]
+        self.vectors = np.load(index / "vectors.npy", mmap_mode="r")
+        self.offsets = np.load(index / "offsets.npy")
+        with open(index / "chunks.txt", "rb") as f:
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets.size else b""
+
+    def __len__(self):
+        return len(self.titles)
+
+    def text(self, row):
+        start, end = self.offsets[row]
+        return self._text[start:end].decode("utf-8")
+
+    def search(self, query, k=KNOWLEDGE_TOP_K, threshold=0.0):
+        """Return up to ``k`` ``(score, title, text)`` hits scoring at least ``threshold``, best first."""
+        if not len(self):
+            return []
+        scores = self.vectors @ embed(query, self.dim)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[row]), self.titles[row], self.text(row)) for row in top if scores[row] >= threshold]
+
+
+_knowledge_base = None
+_knowledge_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """Load the index, building it first if it is missing or older than the documents."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_lock:
+            if _knowledge_base is None:
+                index = KNOWLEDGE_INDEX
+                if is_stale():
+                    try:
+                        build_index()
+                    except OSError:
+                        # Installed read-only: build a private copy instead.
+                        index = Path(tempfile.mkdtemp(prefix="knowledge-"))
+                        build_index(index=index)
+                _knowledge_base = KnowledgeBase(index)
+    return _knowledge_base
+
+
+def answer(query, threshold=KNOWLEDGE_ANSWER_THRESHOLD):
+    """Return the best matching section's text when it is close enough to answer directly."""
+    hits = get_knowledge_base().search(query, k=1, threshold=threshold)
+    return hits[0][2] if hits else None
+
+
+def knowledge_context(query, k=KNOWLEDGE_TOP_K, threshold=KNOWLEDGE_CONTEXT_THRESHOLD):
+    """The sections relevant to ``query`` as text for a message of their own, or None.
+
+    Kept out of the system prompt so that stays the same for every query.
+    """
+    hits = get_knowledge_base().search(query, k, threshold)
+    if not hits:
+        return None
+    context = "\n\n".join(f"{title}\n{text}" for _, title, text in hits)
+    return f"Use this information about our services where it helps:\n\n{context}"
+
+
+def main():
+    if sys.argv[1:2] == ["build"]:
+        count = build_index()
+        print(f"Indexed {count} chunks from {KNOWLEDGE_DIR} into {KNOWLEDGE_INDEX}")
+    else:
+        for query in sys.argv[1:]:
+            for score, title, _ in get_knowledge_base().search(query):
+                print(f"{query!r}: {score:.2f} {title}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+BOOKING_LEDGER_PATH = os.getenv("BOOKING_LEDGER_PATH", "bookings.db")
+LEDGER_FLUSH_INTERVAL = float(os.getenv("LEDGER_FLUSH_INTERVAL", "0.5"))
+LEDGER_BATCH_SIZE = int(os.getenv("LEDGER_BATCH_SIZE", "100"))
+LEDGER_WRITE_RETRIES = int(os.getenv("LEDGER_WRITE_RETRIES", "3"))
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    key TEXT PRIMARY KEY,
+    event_id INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    start TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    response TEXT,
+    latency REAL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+def idempotency_key(email, start_time, event_id):
+    """Key a booking on (email, start instant, event type).
+
+    The start is normalised to UTC so the same slot written with different
+    offsets maps to one key.
+    """
+    start = datetime.fromisoformat(start_time)
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc)
+    raw = f"{email.strip().lower()}|{start.isoformat()}|{event_id}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class BookingLedger:
+    """Local SQLite record of bookings sent to Cal.com.
+
+    Writes are queued and committed in batches by a background thread so
+    callers never wait on disk; reads check the unflushed entries first.
+    A batch that still fails after ``write_retries`` retries is dropped and
+    the error is raised by the next ``flush``.
+    """
+
+    def __init__(self, path=BOOKING_LEDGER_PATH, flush_interval=LEDGER_FLUSH_INTERVAL, batch_size=LEDGER_BATCH_SIZE,
+                 write_retries=LEDGER_WRITE_RETRIES):
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.write_retries = write_retries
+        self._error = None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self._writer = threading.Thread(target=self._write_loop, name="booking-ledger", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(SCHEMA)
+        connection.commit()
+        return connection
+
+    def lookup(self, key):
+        """Return the recorded Cal.com response for a successful booking, or None."""
+        with self._pending_lock:
+            row = self._pending.get(key)
+        if row is None:
+            with self._read_lock:
+                row = self._reader.execute(
+                    "SELECT key, event_id, email, start, ok, response, latency, created_at FROM bookings WHERE key = ?",
+                    (key,),
+                ).fetchone()
+        if row is None or not row[4]:
+            return None
+        return json.loads(row[5]) if row[5] else {}
+
+    def record(self, key, event_id, email, start_time, ok, response=None, latency=None):
+        row = (key, event_id, email, start_time, int(ok), json.dumps(response) if response is not None else None, latency, time.time())
+        with self._pending_lock:
+            self._pending[key] = row
+        self._queue.put(row)
+
+    def flush(self):
+        """Block until every queued write has been committed or dropped.
+
+        Raises the last write error when a batch was dropped since the
+        previous flush.
+        """
+        self._queue.join()
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(connection, batch)
+            finally:
+                with self._pending_lock:
+                    for row in batch:
+                        if self._pending.get(row[0]) is row:
+                            del self._pending[row[0]]
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, connection, batch):
+        for attempt in range(self.write_retries + 1):
+            try:
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO bookings VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                return
+            except Exception as e:
+                error = e
+                logger.warning("booking ledger write of %d rows failed (attempt %d): %s", len(batch), attempt + 1, e)
+                if attempt < self.write_retries:
+                    time.sleep(self.flush_interval * (attempt + 1))
+        logger.error("dropping %d booking ledger rows: %s", len(batch), error)
+        self._error = error
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """Return the process-wide booking ledger."""
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = BookingLedger()
+    return _ledger
@@ -0,0 +1,275 @@
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.metrics import observe, register_stats
+from agent.prompting import SUMMARY_HEADER
+from agent.response_cache import ResponseCache, normalize_prompt
+
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+TIMING_WINDOW = 500
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "1.0"))
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gemini/gemini-1.5-flash-8b")
+LLM_LATENCY_THRESHOLD = float(os.getenv("LLM_LATENCY_THRESHOLD", "8"))
+LLM_FALLBACK_COOLDOWN = float(os.getenv("LLM_FALLBACK_COOLDOWN", "60"))
+
+response_cache = ResponseCache()
+
+# (time to first token, total time) in seconds for recent streamed answers.
+stream_timings = deque(maxlen=TIMING_WINDOW)
+_timings_lock = threading.Lock()
+
+
+def completion(**kwargs):
+    """Call ``litellm.completion``, importing litellm on first use.
+
+    litellm takes seconds to import, and cached, canned and routed answers
+    never need it.
+    """
+    from litellm import completion
+
+    return completion(**kwargs)
+
+
+def _is_rate_limit(error):
+    from litellm.exceptions import RateLimitError
+
+    return isinstance(error, RateLimitError)
+
+
+class _Flight:
+    """One upstream call whose text is shared by every caller asking the same thing."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def push(self, text):
+        with self.cond:
+            self.chunks.append(text)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self.cond:
+                while index == len(self.chunks) and not self.done:
+                    self.cond.wait()
+                chunks = self.chunks[index:]
+                index += len(chunks)
+                if not chunks:
+                    if self.error is not None:
+                        raise self.error
+                    return
+            yield from chunks
+
+
+class Gateway:
+    """Single entry point for model calls.
+
+    Identical prompts already in flight share one upstream call, at most
+    ``max_concurrency`` calls run at once on a fixed pool of threads, rate-limit errors are retried
+    with full-jitter backoff, and a model whose latency went over
+    ``latency_threshold`` is swapped for ``fallback_model`` for
+    ``cooldown`` seconds (as is one still rate limited after its retries).
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_retries=LLM_MAX_RETRIES, backoff=LLM_BACKOFF,
+                 fallback_model=LLM_FALLBACK_MODEL, latency_threshold=LLM_LATENCY_THRESHOLD, cooldown=LLM_FALLBACK_COOLDOWN):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.fallback_model = fallback_model
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._flights = {}
+        self._slow_until = {}
+        self._lock = threading.Lock()
+        self._stats = {"upstream": 0, "coalesced": 0, "retries": 0, "fallbacks": 0}
+
+    def request(self, model, messages, api_key=None, stream=False):
+        """Return an iterator over the answer's text, joining an identical call if one is running."""
+        key = (model, tuple((message["role"], message["content"]) for message in messages))
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats["coalesced"] += 1
+                return iter(flight)
+            flight = self._flights[key] = _Flight()
+        self._executor.submit(self._run, key, flight, model, messages, api_key, stream)
+        return iter(flight)
+
+    def _pick(self, model):
+        if self.fallback_model and model != self.fallback_model and time.monotonic() < self._slow_until.get(model, 0.0):
+            with self._lock:
+                self._stats["fallbacks"] += 1
+            return self.fallback_model
+        return model
+
+    def _run(self, key, flight, model, messages, api_key, stream):
+        model = self._pick(model)
+        attempt = 0
+        try:
+            while True:
+                try:
+                    self._upstream(flight, model, messages, api_key, stream)
+                    break
+                except Exception as e:
+                    if not _is_rate_limit(e) or flight.chunks:
+                        raise
+                    if attempt < self.max_retries:
+                        with self._lock:
+                            self._stats["retries"] += 1
+                        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                        attempt += 1
+                    elif self.fallback_model and model != self.fallback_model:
+                        self._mark_slow(model)
+                        with self._lock:
+                            self._stats["fallbacks"] += 1
+                        model, attempt = self.fallback_model, 0
+                    else:
+                        raise
+            flight.finish()
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _upstream(self, flight, model, messages, api_key, stream):
+        with self._lock:
+            self._stats["upstream"] += 1
+        started = time.perf_counter()
+        first_token = None
+        response = completion(model=model, messages=messages, api_key=api_key, stream=stream)
+        if stream:
+            for chunk in response:
+                text = chunk["choices"][0]["delta"].get("content")
+                if text:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    flight.push(text)
+        else:
+            flight.push(response["choices"][0]["message"]["content"] or "")
+        total = time.perf_counter() - started
+        observe("llm_upstream", total)
+        if (first_token if first_token is not None else total) > self.latency_threshold:
+            self._mark_slow(model)
+
+    def _mark_slow(self, model):
+        if model != self.fallback_model:
+            self._slow_until[model] = time.monotonic() + self.cooldown
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights))
+
+
+gateway = Gateway()
+
+
+# Words that make a question lean on what was said before it.
+_REFERS_BACK = re.compile(
+    r"\b(it|its|that|this|these|those|they|them|their|he|she|his|her|one|more|else|other|same|again|also|too|"
+    r"above|previous|earlier|before|yes|no|ok|okay|why|how come)\b"
+)
+STANDALONE_MIN_WORDS = 4
+
+
+def _cache_key(messages):
+    """Return ``(context hash, question)`` when the answer does not depend on earlier turns, else None.
+
+    The context is the fixed system prompt plus any retrieved passages. A
+    question asked after earlier turns (verbatim or summarized) is still
+    cached when it stands on its own: long enough and not referring back.
+    """
+    *context, question = messages
+    if question["role"] != "user":
+        return None
+    fixed = [message["content"] for message in context if message["role"] == "system" and not message["content"].startswith(SUMMARY_HEADER)]
+    if len(fixed) < len(context):
+        words = normalize_prompt(question["content"]).split()
+        if len(words) < STANDALONE_MIN_WORDS or _REFERS_BACK.search(" ".join(words)):
+            return None
+    digest = hashlib.blake2b("\0".join(fixed).encode("utf-8"), digest_size=16).hexdigest()
+    return digest, question["content"]
+
+
+def complete(model, messages, api_key=None):
+    """Answer a conversation, serving context-free repeats from the response cache."""
+    key = _cache_key(messages)
+    if key is not None:
+        cached = response_cache.get(model, key[1], key[0])
+        if cached is not None:
+            return cached
+
+    text = "".join(gateway.request(model, messages, api_key)).strip()
+    if key is not None:
+        response_cache.put(model, key[1], text, key[0])
+    return text
+
+
+def stream(model, messages, api_key=None):
+    """Yield the answer to a conversation chunk by chunk as the model produces it.
+
+    A cached answer is yielded in one piece. Time to first token and total
+    time of every streamed answer are recorded in ``stream_timings``.
+    """
+    key = _cache_key(messages)
+    if key is not None:
+        cached = response_cache.get(model, key[1], key[0])
+        if cached is not None:
+            yield cached
+            return
+
+    started = time.perf_counter()
+    first_token = None
+    parts = []
+    for text in gateway.request(model, messages, api_key, stream=True):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+            text = text.lstrip()
+        parts.append(text)
+        yield text
+
+    total = time.perf_counter() - started
+    with _timings_lock:
+        stream_timings.append((first_token if first_token is not None else total, total))
+    if key is not None:
+        response_cache.put(model, key[1], "".join(parts).strip(), key[0])
+
+
+def streaming_stats():
+    """Median and worst time to first token and total time of recent streams."""
+    with _timings_lock:
+        timings = list(stream_timings)
+    if not timings:
+        return {"count": 0}
+    first_tokens = sorted(t[0] for t in timings)
+    totals = sorted(t[1] for t in timings)
+    return {
+        "count": len(timings),
+        "ttft_p50": first_tokens[len(first_tokens) // 2],
+        "ttft_max": first_tokens[-1],
+        "total_p50": totals[len(totals) // 2],
+        "total_max": totals[-1],
+    }
+
+
+register_stats("streaming", streaming_stats)
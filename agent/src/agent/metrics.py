@@ -0,0 +1,294 @@
+"""Low-overhead timing histograms for the hot paths, with Prometheus and JSON export.
+
+Configuration:
+
+- ``METRICS_ENABLED`` turns collection on or off at startup; ``set_enabled``
+  flips it at runtime.
+- ``METRICS_PORT`` serves ``/metrics`` (Prometheus text) and
+  ``/metrics.json`` on that port, bound to ``METRICS_HOST`` (loopback by
+  default). The JSON also carries the counters that modules report
+  through ``register_stats``.
+- ``METRICS_DUMP_PATH`` writes a JSON snapshot every
+  ``METRICS_DUMP_INTERVAL`` seconds.
+- ``TRACE_PATH`` appends every ``trace`` event to a JSON-lines file; the
+  latest ``TRACE_BUFFER`` events are also served as ``/traces.json``.
+"""
+import bisect
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_DUMP_PATH = os.getenv("METRICS_DUMP_PATH")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+TRACE_PATH = os.getenv("TRACE_PATH")
+TRACE_BUFFER = int(os.getenv("TRACE_BUFFER", "1000"))
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = METRICS_ENABLED
+_histograms = {}
+_stats_sources = {}
+_registry_lock = threading.Lock()
+_traces = deque(maxlen=TRACE_BUFFER)
+_trace_file = None
+_trace_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in seconds."""
+
+    __slots__ = ("name", "counts", "count", "sum", "lock")
+
+    def __init__(self, name):
+        self.name = name
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def snapshot(self):
+        with self.lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+        return {"count": count, "sum": total, "buckets": dict(zip([*BUCKETS, "+Inf"], counts))}
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def histogram(name):
+    hist = _histograms.get(name)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(name, Histogram(name))
+    return hist
+
+
+def observe(name, seconds):
+    if _enabled:
+        histogram(name).observe(seconds)
+
+
+@contextlib.contextmanager
+def timer(name):
+    if not _enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram(name).observe(time.perf_counter() - started)
+
+
+def timed(name):
+    """Decorator recording each call's duration under ``name``.
+
+    Generator functions are timed until they are exhausted, so streamed
+    answers count their full duration.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return (yield from func(*args, **kwargs))
+                started = time.perf_counter()
+                try:
+                    return (yield from func(*args, **kwargs))
+                finally:
+                    histogram(name).observe(time.perf_counter() - started)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram(name).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def trace(event, **fields):
+    """Record a structured event, e.g. ``trace("crew_task", task="write_poem", seconds=1.2)``.
+
+    Events are plain dicts kept in a bounded buffer, and written as one
+    JSON line each when ``TRACE_PATH`` is set.
+    """
+    global _trace_file
+    if not _enabled:
+        return
+    record = {"ts": time.time(), "event": event, **fields}
+    _traces.append(record)
+    if TRACE_PATH:
+        line = json.dumps(record, default=str) + "\n"
+        with _trace_lock:
+            if _trace_file is None:
+                _trace_file = open(TRACE_PATH, "a", encoding="utf-8", buffering=1)
+            _trace_file.write(line)
+
+
+def recent_traces(event=None):
+    """The buffered trace events, oldest first, optionally only those named ``event``."""
+    return [record for record in list(_traces) if event is None or record["event"] == event]
+
+
+def snapshot():
+    with _registry_lock:
+        histograms = list(_histograms.values())
+    return {hist.name: hist.snapshot() for hist in histograms}
+
+
+def register_stats(name, source):
+    """Report ``source()`` under ``name`` in ``/metrics.json`` and the JSON dump."""
+    with _registry_lock:
+        _stats_sources[name] = source
+
+
+def stats():
+    with _registry_lock:
+        sources = list(_stats_sources.items())
+    return {name: source() for name, source in sources}
+
+
+def render_prometheus():
+    """Render every histogram in the Prometheus text exposition format."""
+    lines = []
+    for name, data in sorted(snapshot().items()):
+        metric = f"agent_{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in data["buckets"].items():
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum {data['sum']}")
+        lines.append(f"{metric}_count {data['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(render_prometheus(), "text/plain; version=0.0.4")
+        elif self.path == "/metrics.json":
+            self._send(json.dumps({"enabled": _enabled, "histograms": snapshot(), "stats": stats()}), "application/json")
+        elif self.path == "/traces.json":
+            self._send(json.dumps(recent_traces(), default=str), "application/json")
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path in ("/enable", "/disable"):
+            set_enabled(self.path == "/enable")
+            self._send(json.dumps({"enabled": _enabled}), "application/json")
+        else:
+            self.send_error(404)
+
+
+def start_http_server(port, host=METRICS_HOST):
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_json_dump(path, interval=METRICS_DUMP_INTERVAL):
+    def dump():
+        while True:
+            time.sleep(interval)
+            Path(path).write_text(json.dumps({"timestamp": time.time(), "histograms": snapshot(), "stats": stats()}), encoding="utf-8")
+
+    thread = threading.Thread(target=dump, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """Start the HTTP endpoint and JSON dump configured in the environment, once per process."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        if METRICS_PORT:
+            start_http_server(METRICS_PORT)
+        if METRICS_DUMP_PATH:
+            start_json_dump(METRICS_DUMP_PATH)
+
+
+@contextlib.contextmanager
+def profiled(enabled, name="session"):
+    """Profile the wrapped block into ``PROFILE_DIR`` when ``enabled``.
+
+    Uses pyinstrument when it is installed and cProfile otherwise.
+    """
+    if not enabled:
+        yield
+        return
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILE_DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns() % 1_000_000}"
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{stem}.prof")
+        return
+
+    profiler = Profiler()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        Path(f"{stem}.html").write_text(profiler.output_html(), encoding="utf-8")
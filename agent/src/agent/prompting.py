@@ -0,0 +1,108 @@
+import os
+import re
+import threading
+from functools import lru_cache
+
+from agent.metrics import register_stats
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "300"))
+SUMMARY_WORDS = 25
+SUMMARY_HEADER = "Earlier in this conversation:\n"
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "tokens": 0, "max_tokens": 0, "summarized_turns": 0}
+
+
+def count_tokens(text):
+    """Estimate tokens locally as words plus punctuation marks."""
+    return len(_TOKEN.findall(text))
+
+
+@lru_cache(maxsize=32)
+def system_message(prompt):
+    """Build the system message and its token count once per prompt."""
+    return {"role": "system", "content": prompt}, count_tokens(prompt)
+
+
+def message_tokens(message):
+    if message.tokens is None:
+        message.tokens = count_tokens(message.content)
+    return message.tokens
+
+
+def message_summary(message):
+    """One-line extractive summary of a message, computed once and kept on it."""
+    if message.summary is None:
+        first_sentence = _SENTENCE_END.split(message.content.strip(), 1)[0]
+        words = first_sentence.split()
+        text = " ".join(words[:SUMMARY_WORDS]) + (" ..." if len(words) > SUMMARY_WORDS else "")
+        message.summary = f"- {message.role}: {text}"
+    return message.summary
+
+
+def assemble_prompt(system_prompt, history, user_input, context=None, budget=PROMPT_TOKEN_BUDGET):
+    """Build the ``messages`` list for a completion under a token budget.
+
+    ``history`` holds the earlier ``Message`` records of the conversation,
+    oldest first. The newest turns that fit are sent verbatim; older turns are
+    folded into a summary message. ``context`` (retrieved passages) goes in a
+    system message after the fixed system prompt.
+    """
+    system, system_tokens = system_message(system_prompt)
+    used = system_tokens + count_tokens(user_input)
+    if context:
+        used += count_tokens(context)
+
+    recent = []
+    cut = len(history)
+    for message in reversed(history):
+        tokens = message_tokens(message)
+        if used + tokens > budget - SUMMARY_TOKEN_BUDGET:
+            break
+        used += tokens
+        recent.append({"role": message.role, "content": message.content})
+        cut -= 1
+    recent.reverse()
+
+    messages = [system]
+    if context:
+        messages.append({"role": "system", "content": context})
+    if cut:
+        lines = []
+        summary_tokens = 0
+        for message in reversed(history[:cut]):
+            line = message_summary(message)
+            tokens = count_tokens(line)
+            if summary_tokens + tokens > SUMMARY_TOKEN_BUDGET:
+                break
+            summary_tokens += tokens
+            lines.append(line)
+        if lines:
+            lines.reverse()
+            messages.append({"role": "system", "content": SUMMARY_HEADER + "\n".join(lines)})
+            used += summary_tokens
+
+    messages.extend(recent)
+    messages.append({"role": "user", "content": user_input})
+
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["tokens"] += used
+        _stats["max_tokens"] = max(_stats["max_tokens"], used)
+        _stats["summarized_turns"] += cut
+    return messages
+
+
+def prompt_stats():
+    """Tokens sent per call so far."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["mean_tokens"] = stats["tokens"] / stats["calls"] if stats["calls"] else 0
+    return stats
+
+
+register_stats("prompts", prompt_stats)
@@ -0,0 +1,117 @@
+import os
+import re
+import threading
+
+import numpy as np
+
+from agent.cache import TTLCache
+from agent.embeddings import EMBED_DIM, embed
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() in ("1", "true", "yes")
+SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    """Lower-case a prompt and strip punctuation and repeated whitespace."""
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", prompt.lower())).strip()
+
+
+class SemanticIndex:
+    """Fixed-size cosine index over prompt embeddings, kept in one NumPy matrix.
+
+    Rows are reused round-robin once the index is full, so it never holds
+    more than ``size`` prompts.
+    """
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE, dim=EMBED_DIM):
+        self.vectors = np.zeros((size, dim), dtype=np.float32)
+        self.keys = [None] * size
+        self.next_row = 0
+        self.lock = threading.Lock()
+
+    def add(self, key, vector):
+        with self.lock:
+            row = self.next_row
+            self.vectors[row] = vector
+            self.keys[row] = key
+            self.next_row = (row + 1) % len(self.keys)
+
+    def nearest(self, vector, scope, threshold=SIMILARITY_THRESHOLD):
+        """Return the cached key most similar to ``vector`` within ``scope``, if close enough."""
+        with self.lock:
+            scores = self.vectors @ vector
+            for row in np.argsort(scores)[::-1]:
+                if scores[row] < threshold:
+                    return None
+                key = self.keys[row]
+                if key is not None and key[:2] == scope:
+                    return key
+        return None
+
+    def remove(self, key):
+        with self.lock:
+            for row, existing in enumerate(self.keys):
+                if existing == key:
+                    self.keys[row] = None
+                    self.vectors[row] = 0
+
+
+class ResponseCache:
+    """LLM response cache keyed on model, system prompt and normalised prompt.
+
+    With ``semantic`` enabled a miss on the exact key falls back to the most
+    similar cached prompt above ``threshold``.
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, semantic=RESPONSE_CACHE_SEMANTIC, threshold=SIMILARITY_THRESHOLD):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.index = SemanticIndex(maxsize) if semantic else None
+        self.threshold = threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, model, prompt, system_prompt=""):
+        normalized = normalize_prompt(prompt)
+        response = self.entries.get((model, system_prompt, normalized))
+        if response is not None:
+            self.hits += 1
+            return response
+
+        if self.index is not None:
+            key = self.index.nearest(embed(normalized), (model, system_prompt), self.threshold)
+            if key is not None:
+                response = self.entries.get(key)
+                if response is not None:
+                    self.semantic_hits += 1
+                    return response
+                # The entry expired or was evicted from the LRU.
+                self.index.remove(key)
+
+        self.misses += 1
+        return None
+
+    def put(self, model, prompt, response, system_prompt=""):
+        normalized = normalize_prompt(prompt)
+        key = (model, system_prompt, normalized)
+        self.entries.set(key, response)
+        if self.index is not None:
+            self.index.add(key, embed(normalized))
+
+    def clear(self):
+        self.entries.clear()
+        if self.index is not None:
+            self.index = SemanticIndex(len(self.index.keys), self.index.vectors.shape[1])
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,111 @@
+"""The interactive crewai flow behind the ``appoointment`` CLI."""
+from crewai.flow.flow import Flow, start, listen, router
+import os
+from agent.appointment import INTENT_ROUTES, ROUTER, SYSTEM_PROMPT, schedule_tool
+from agent.dispatch import compile_flow
+from agent.history import Message
+from agent.intents import canned_answer, classify_intent
+from agent.knowledge import knowledge_context
+from agent.llm import STREAM_RESPONSES, complete, stream
+from agent.metrics import timed
+from agent.prompting import assemble_prompt
+
+
+class Conversation:
+    """One chat's routing and LLM turns, with no crewai Flow around it.
+
+    The chat server keeps one per connection; constructing a Flow there would
+    emit crewai events and print a console panel for every client.
+    """
+
+    model = "gemini/gemini-1.5-flash"
+    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+    def __init__(self):
+        self.state = {}
+
+    @timed("flow_route_topic")
+    def route_topic(self, user_input):
+        route = ROUTER.route(user_input)
+        if route == "conversation_route":
+            route = INTENT_ROUTES.get(classify_intent(user_input), route)
+        return route
+
+    def respond(self, user_input, on_text=None):
+        """Answer one conversation turn and remember it in the history.
+
+        With streaming on, text is passed to ``on_text`` as it arrives.
+        """
+        history = self.state.setdefault("history", [])
+        messages = assemble_prompt(SYSTEM_PROMPT, history, user_input, knowledge_context(user_input))
+        if STREAM_RESPONSES and on_text is not None:
+            parts = []
+            for text in stream(self.model, messages, self.GEMINI_API_KEY):
+                on_text(text)
+                parts.append(text)
+            outline = "".join(parts).strip()
+        else:
+            outline = complete(self.model, messages, self.GEMINI_API_KEY)
+        history.append(Message("user", user_input))
+        history.append(Message("assistant", outline))
+        return outline
+
+
+class RoutedFlow(Flow, Conversation):
+    # State that outlives a turn; everything else is cleared by reset_turn().
+    KEEP_STATE = ("id", "history")
+
+    def reset_turn(self):
+        """Clear the previous turn's keys from the state, keeping the conversation."""
+        state = self.state
+        for key in [key for key in state if key not in self.KEEP_STATE]:
+            del state[key]
+
+    def turn(self):
+        """Run one turn through the precompiled graph; the cheap equivalent of ``kickoff()``."""
+        self.reset_turn()
+        return compile_flow(type(self)).run(self)
+
+    @start()
+    @timed("flow_start_conversation")
+    def start_conversation(self):
+        user_input = input("You: ").strip()
+        self.state["user_input"] = user_input
+        return user_input
+
+    @router(start_conversation)
+    def route_topic(self, user_input):
+        return super().route_topic(user_input)
+
+    @listen("schedule_route")
+    @timed("flow_generate_schedule")
+    def generate_schedule(self):
+        print("Agent: Redirecting to the scheduling agent...")
+        schedule_tool(self.state.get("user_input", ""))
+
+    @listen("canned_route")
+    @timed("flow_generate_canned")
+    def generate_canned(self):
+        answer = canned_answer(classify_intent(self.state.get("user_input", "")))
+        print(f"Agent: {answer}")
+        return answer
+
+    @listen("conversation_route")
+    @timed("flow_generate_conversation")
+    def generate_conversation(self):
+        user_input = self.state.get("user_input", "")
+        if not user_input:
+            print("Agent: No input provided.")
+            return
+
+        try:
+            if STREAM_RESPONSES:
+                print("Agent: ", end="", flush=True)
+                outline = self.respond(user_input, lambda text: print(text, end="", flush=True))
+                print()
+            else:
+                outline = self.respond(user_input)
+                print(f"Agent: {outline}")
+            return outline
+        except Exception as e:
+            print(f"Agent: ERROR: {e}")
@@ -0,0 +1,50 @@
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+ROUTES_CONFIG = Path(__file__).parent / "config" / "routes.yaml"
+
+
+@lru_cache(maxsize=None)
+def load_config(path=ROUTES_CONFIG):
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def compile_keywords(keywords):
+    """Compile lower-case keywords into one whole-word regex."""
+    # Longest first so "time slot" wins over any shorter overlapping keyword.
+    alternatives = "|".join(
+        re.escape(keyword.lower()).replace(r"\ ", r"\s+")
+        for keyword in sorted(keywords, key=len, reverse=True)
+    )
+    return re.compile(rf"\b(?:{alternatives})s?\b")
+
+
+class KeywordRouter:
+    """Maps a message to the first route whose keywords it mentions."""
+
+    def __init__(self, routes, default="conversation_route"):
+        self.default = default
+        self.patterns = [(name, compile_keywords(keywords)) for name, keywords in routes.items()]
+
+    def route(self, text):
+        # Lower-casing once is cheaper than re.IGNORECASE on every pattern.
+        text = text.lower()
+        for name, pattern in self.patterns:
+            if pattern.search(text):
+                return name
+        return self.default
+
+    @classmethod
+    def from_config(cls, section="routes", names=None, default="conversation_route"):
+        """Build a router from a section of ``config/routes.yaml``.
+
+        ``names`` restricts it to a subset of the routes, keeping config order.
+        """
+        routes = load_config()[section]
+        if names is not None:
+            routes = {name: keywords for name, keywords in routes.items() if name in names}
+        return cls(routes, default)
@@ -0,0 +1,65 @@
+"""Objects built once per process and shared by every session.
+
+Streamlit re-executes the app script on every rerun, so anything built at
+its top level is rebuilt on each message. The apps keep a ``Runtime`` in
+``st.cache_resource`` instead and hand per-session state (chat history,
+pending bookings) to it on each call.
+"""
+import threading
+
+from dotenv import load_dotenv
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env():
+    """Load ``.env`` into the environment, once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        with _env_lock:
+            if not _env_loaded:
+                load_dotenv()
+                _env_loaded = True
+
+
+class Runtime:
+    """The flow plus the process-wide Cal.com clients, event types, session store and ledger.
+
+    The flow must not keep per-session state; the shared clients are
+    created on first use.
+    """
+
+    def __init__(self, flow):
+        self.flow = flow
+
+    # Imported on use: calcom itself calls load_env() at import.
+    @property
+    def calcom(self):
+        from agent.calcom import get_session
+
+        return get_session()
+
+    @property
+    def pipeline(self):
+        from agent.booking_queue import get_pipeline
+
+        return get_pipeline()
+
+    @property
+    def event_types(self):
+        from agent.event_types import get_registry
+
+        return get_registry()
+
+    @property
+    def sessions(self):
+        from agent.session_store import get_session_store
+
+        return get_session_store()
+
+    @property
+    def ledger(self):
+        from agent.ledger import get_ledger
+
+        return get_ledger()
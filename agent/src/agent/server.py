@@ -0,0 +1,225 @@
+"""Line-protocol chat server running one conversation per connection.
+
+    app_server                      # or: python -m agent.server
+
+Every line a client sends is one user turn and every reply line starts
+with ``Agent:``; streamed answers arrive on that line as they are
+generated. Routing and canned answers run on the event loop, while LLM
+and Cal.com calls go to a bounded worker pool.
+
+Configuration:
+
+- ``SERVER_HOST`` / ``SERVER_PORT``: where to listen.
+- ``SERVER_MAX_SESSIONS``: connections beyond this are told to retry later.
+- ``SERVER_WORKERS``: threads for blocking LLM and Cal.com calls.
+- ``SERVER_MAX_PENDING``: turns allowed to wait for a worker; further turns
+  are answered with a busy message instead of queueing without bound.
+- ``SERVER_IDLE_TIMEOUT``: seconds of client silence before disconnecting.
+- ``SERVER_LINE_LIMIT``: longest accepted input line, in bytes.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.appointment import booking_dialogue, schedule_booking
+from agent.event_types import get_registry
+from agent.extraction import extract_booking
+from agent.intents import canned_answer, classify_intent
+from agent.metrics import start_exporters
+from agent.routed_flow import Conversation
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8765"))
+SERVER_MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "1000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "64"))
+SERVER_MAX_PENDING = int(os.getenv("SERVER_MAX_PENDING", "512"))
+SERVER_IDLE_TIMEOUT = float(os.getenv("SERVER_IDLE_TIMEOUT", "600"))
+SERVER_LINE_LIMIT = int(os.getenv("SERVER_LINE_LIMIT", "8192"))
+
+WELCOME = "Agent: Welcome to AICongiTech! Redefining health and wellness with innovative AI solutions tailored for you. How may we assist you today?"
+GOODBYE = "Agent: Take care! See you soon!"
+BUSY = "Agent: We are busy right now, please try again in a moment."
+
+
+class Busy(Exception):
+    """Raised when the worker pool and its waiting line are both full."""
+
+
+class LineTooLong(Exception):
+    """Raised when a client sends a line longer than the reader's limit."""
+
+
+class ChatServer:
+    def __init__(self, max_sessions=SERVER_MAX_SESSIONS, workers=SERVER_WORKERS, max_pending=SERVER_MAX_PENDING, idle_timeout=SERVER_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.max_inflight = workers + max_pending
+        self.idle_timeout = idle_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat-worker")
+        self.sessions = 0
+        self.inflight = 0
+        self.rejected = 0
+        self.shed = 0
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call on the worker pool, or raise Busy when it is saturated."""
+        if self.inflight >= self.max_inflight:
+            self.shed += 1
+            raise Busy()
+        self.inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.inflight -= 1
+
+    async def handle(self, reader, writer):
+        if self.sessions >= self.max_sessions:
+            self.rejected += 1
+            writer.write(f"{BUSY}\n".encode())
+            await _close(writer)
+            return
+
+        self.sessions += 1
+        try:
+            await Session(self, reader, writer).run()
+        except (ConnectionError, EOFError, TimeoutError, asyncio.TimeoutError, LineTooLong):
+            # Disconnects, idle clients and over-long lines all end the session.
+            pass
+        finally:
+            self.sessions -= 1
+            await _close(writer)
+
+    def stats(self):
+        return {
+            "sessions": self.sessions,
+            "inflight": self.inflight,
+            "rejected": self.rejected,
+            "shed": self.shed,
+        }
+
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT, limit=SERVER_LINE_LIMIT):
+        server = await asyncio.start_server(self.handle, host, port, limit=limit, backlog=self.max_sessions)
+        async with server:
+            await server.serve_forever()
+
+
+class Session:
+    """One client's connection, backed by its own Conversation."""
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.flow = Conversation()
+
+    async def send(self, text, end="\n"):
+        self.writer.write(f"{text}{end}".encode())
+        await self.writer.drain()
+
+    async def readline(self):
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), self.server.idle_timeout)
+        except ValueError as e:
+            # StreamReader reports a line over its limit as a bare ValueError.
+            raise LineTooLong() from e
+        if not line:
+            raise EOFError()
+        return line.decode("utf-8", errors="replace").strip()
+
+    async def run(self):
+        await self.send(WELCOME)
+        while True:
+            user_input = await self.readline()
+            if not user_input:
+                continue
+            output = await self.turn(user_input)
+            if output and any(word in output.lower() for word in ["bye", "quit", "stop"]):
+                await self.send(GOODBYE)
+                return
+
+    async def turn(self, user_input):
+        self.flow.state["user_input"] = user_input
+        route = self.flow.route_topic(user_input)
+        if route == "schedule_route":
+            await self.schedule(user_input)
+            return None
+        if route == "canned_route":
+            answer = canned_answer(classify_intent(user_input))
+            await self.send(f"Agent: {answer}")
+            return answer
+        return await self.converse(user_input)
+
+    async def converse(self, user_input):
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        task = asyncio.ensure_future(self.server.run_blocking(
+            self.flow.respond, user_input, lambda text: loop.call_soon_threadsafe(chunks.put_nowait, text)
+        ))
+        task.add_done_callback(lambda _: chunks.put_nowait(None))
+
+        streamed = False
+        while (text := await chunks.get()) is not None:
+            await self.send(text if streamed else f"Agent: {text}", end="")
+            streamed = True
+        if streamed:
+            await self.send("")
+
+        try:
+            answer = task.result()
+        except Busy:
+            await self.send(BUSY)
+            return None
+        except Exception as e:
+            await self.send(f"Agent: ERROR: {e}")
+            return None
+        if not streamed:
+            await self.send(f"Agent: {answer}")
+        return answer
+
+    async def schedule(self, request):
+        event_type = get_registry().match(request)
+        await self.send(f"Agent: Selected Event Type: {event_type.title} ({event_type.length} min)")
+        dialogue = booking_dialogue(event_type, details=extract_booking(request))
+        try:
+            prompt = next(dialogue)
+            while True:
+                await self.send(prompt)
+                prompt = dialogue.send(await self.readline())
+        except StopIteration as done:
+            booking = done.value
+        except ValueError as e:
+            await self.send(f"Agent: Error: {e}")
+            return
+
+        try:
+            result = await self.server.run_blocking(schedule_booking, **booking)
+        except Busy:
+            await self.send(BUSY)
+            return
+        if result:
+            await self.send("Agent: Booking successfully scheduled! Check your email for the confirmation and meeting details.")
+        else:
+            await self.send("Agent: Failed to schedule the booking.")
+
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (ConnectionError, OSError):
+        pass
+
+
+def main():
+    start_exporters()
+    server = ChatServer()
+    print(f"Serving chat sessions on {SERVER_HOST}:{SERVER_PORT}")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""Chat sessions shared by every replica of the apps.
+
+A session is its chat history plus a few UI flags. ``SESSION_STORE``
+picks the backend:
+
+- ``sqlite:sessions.db`` (default): one SQLite file, for replicas and
+  restarts on one host.
+- ``redis://host:6379/0``: any server speaking the Redis protocol, for
+  replicas on several hosts. A small built-in client is used, so the
+  ``redis`` package is not needed.
+- ``none``: keep sessions in ``st.session_state`` only.
+
+Each save appends only the messages added since the last one and writes
+the flags that changed; messages are never rewritten, so replicas sharing
+a session cannot overwrite each other's. Loads and the local cache hold
+only the greeting and the newest messages that fit the ``ChatHistory``
+memory cap. Values are packed with msgpack when it is installed
+and JSON otherwise; a one-byte tag says which, so both can be read back.
+Every store keeps a read-through cache of recent sessions, checked
+against the backend's version counter before use.
+"""
+import json
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from queue import Empty, LifoQueue
+from urllib.parse import urlparse
+
+from agent.cache import TTLCache
+from agent.history import HISTORY_MAX_CHARS, ChatHistory, Message
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite:sessions.db")
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "300"))
+# Most messages read back when a session is restored, before the character cap.
+SESSION_RESTORE_MESSAGES = int(os.getenv("SESSION_RESTORE_MESSAGES", "500"))
+SESSION_CODEC = os.getenv("SESSION_CODEC", "msgpack" if msgpack is not None else "json")
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "8"))
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "2"))
+
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def pack(value, codec=SESSION_CODEC):
+    if codec == "msgpack":
+        return b"m" + msgpack.packb(value, use_bin_type=True)
+    return b"j" + json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def unpack(data):
+    if data[:1] == b"m":
+        return msgpack.unpackb(data[1:], raw=False)
+    return json.loads(data[1:])
+
+
+def session_id(query_params):
+    """The session id in the page URL (``?sid=``), adding a new one when it is missing.
+
+    Keeping it in the URL lets a reconnect that lands on another replica
+    find the same session.
+    """
+    sid = query_params.get("sid")
+    if not sid or not _SESSION_ID.fullmatch(sid):
+        sid = uuid.uuid4().hex
+        query_params["sid"] = sid
+    return sid
+
+
+class SessionData:
+    """A session as last seen: ``count`` messages ever saved, the tail of them, and the flags.
+
+    Backends fill it with packed values; the store unpacks them. Messages
+    are ``[role, content]`` pairs.
+    """
+
+    __slots__ = ("version", "count", "messages", "fields")
+
+    def __init__(self, version=0, count=0, messages=(), fields=None):
+        self.version = version
+        self.count = count
+        self.messages = list(messages)
+        self.fields = dict(fields or {})
+
+    def history(self):
+        """The saved messages as a ``ChatHistory`` that counts the older ones as dropped."""
+        history = ChatHistory(Message(role, content) for role, content in self.messages)
+        history.dropped += self.count - len(self.messages)
+        return history
+
+
+def cap_messages(messages, max_chars=HISTORY_MAX_CHARS):
+    """Drop the oldest ``[role, content]`` pairs after the greeting, as ``ChatHistory`` does."""
+    chars = sum(len(content) for _, content in messages)
+    drop = 0
+    while chars > max_chars and len(messages) - drop > 2:
+        drop += 1
+        chars -= len(messages[drop][1])
+    if drop:
+        del messages[1:drop + 1]
+    return messages
+
+
+class SQLiteBackend:
+    """Sessions in one SQLite file; safe for several processes on one host."""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, version INTEGER NOT NULL, count INTEGER NOT NULL, updated_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS session_messages (sid TEXT NOT NULL, seq INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (sid, seq)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS session_fields (sid TEXT NOT NULL, name TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (sid, name)) WITHOUT ROWID",
+    )
+
+    def __init__(self, path, ttl=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._connection:
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+        self.purge()
+
+    def version(self, sid):
+        with self._lock:
+            row = self._connection.execute("SELECT version FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, sid, start=0, limit=None):
+        """Return packed ``SessionData`` with the messages from number ``start`` on.
+
+        A load from the beginning with a ``limit`` reads the first message
+        and the last ``limit`` only.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT version, count FROM sessions WHERE sid = ?", (sid,)).fetchone()
+            if row is None:
+                return SessionData()
+            tail = max(start, row[1] - limit) if limit and not start else start
+            messages = self._connection.execute(
+                "SELECT data FROM session_messages WHERE sid = ? AND (seq >= ? OR seq = ?) ORDER BY seq", (sid, tail, start)
+            ).fetchall()
+            fields = self._connection.execute("SELECT name, data FROM session_fields WHERE sid = ?", (sid,)).fetchall()
+        return SessionData(row[0], row[1], [data for data, in messages], dict(fields))
+
+    def save(self, sid, messages, fields):
+        """Append packed ``messages``, set packed ``fields``; return the new ``(version, count)``."""
+        with self._lock, self._connection:
+            # Claiming the message numbers first takes the write lock, so a
+            # replica appending at the same time gets the numbers after ours.
+            version, count = self._connection.execute(
+                "INSERT INTO sessions VALUES (?, 1, ?, ?) ON CONFLICT (sid) DO UPDATE SET "
+                "version = version + 1, count = count + excluded.count, updated_at = excluded.updated_at "
+                "RETURNING version, count",
+                (sid, len(messages), time.time()),
+            ).fetchone()
+            start = count - len(messages)
+            self._connection.executemany(
+                "INSERT INTO session_messages VALUES (?, ?, ?)",
+                [(sid, start + index, data) for index, data in enumerate(messages)],
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO session_fields VALUES (?, ?, ?)", [(sid, name, data) for name, data in fields.items()]
+            )
+        return version, count
+
+    def purge(self):
+        """Delete sessions untouched for ``ttl`` seconds."""
+        cutoff = time.time() - self.ttl
+        with self._lock, self._connection:
+            expired = "SELECT sid FROM sessions WHERE updated_at < ?"
+            self._connection.execute(f"DELETE FROM session_messages WHERE sid IN ({expired})", (cutoff,))
+            self._connection.execute(f"DELETE FROM session_fields WHERE sid IN ({expired})", (cutoff,))
+            self._connection.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+
+
+class RespError(Exception):
+    """An error reply from a Redis-protocol server."""
+
+
+class RespClient:
+    """Minimal pooled client for the Redis protocol (RESP2), with pipelining."""
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, pool_size=REDIS_POOL_SIZE, timeout=REDIS_TIMEOUT):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._pool = LifoQueue(maxsize=pool_size)
+
+    @classmethod
+    def from_url(cls, url):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "127.0.0.1", parsed.port or 6379, db, parsed.password)
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        setup = ([("AUTH", self.password)] if self.password else []) + ([("SELECT", self.db)] if self.db else [])
+        if setup:
+            self._roundtrip(connection, setup)
+        return connection
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        """Send every command at once and return their replies in order.
+
+        Raises ``RespError`` if any reply is an error.
+        """
+        try:
+            connection = self._pool.get_nowait()
+        except Empty:
+            connection = self._connect()
+        try:
+            replies = self._roundtrip(connection, commands)
+        except (OSError, ConnectionError):
+            connection[0].close()
+            raise
+        try:
+            self._pool.put_nowait(connection)
+        except Exception:
+            connection[0].close()
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def _roundtrip(self, connection, commands):
+        sock, reader = connection
+        sock.sendall(b"".join(_encode(command) for command in commands))
+        return [_read_reply(reader) for _ in commands]
+
+
+def _encode(command):
+    parts = [b"*%d\r\n" % len(command)]
+    for arg in command:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        return RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        return None if length < 0 else [_read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"unexpected reply {line!r}")
+
+
+class RedisBackend:
+    """Sessions as a list, a hash and a version counter per session, each with a TTL."""
+
+    def __init__(self, client, ttl=SESSION_TTL, prefix="session"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _keys(self, sid):
+        return tuple(f"{self.prefix}:{sid}:{part}" for part in ("version", "messages", "fields"))
+
+    def version(self, sid):
+        return int(self.client.execute("GET", self._keys(sid)[0]) or 0)
+
+    def load(self, sid, start=0, limit=None):
+        version_key, messages_key, fields_key = self._keys(sid)
+        if limit and not start:
+            # The greeting, then the last ``limit`` messages.
+            ranges = [("LRANGE", messages_key, 0, 0), ("LRANGE", messages_key, -limit, -1)]
+        else:
+            ranges = [("LRANGE", messages_key, start, -1)]
+        version, count, fields, *parts = self.client.pipeline([
+            ("GET", version_key), ("LLEN", messages_key), ("HGETALL", fields_key), *ranges,
+        ])
+        if version is None:
+            return SessionData()
+        messages = parts[-1] if len(parts) == 1 or count <= limit else parts[0] + parts[1]
+        return SessionData(int(version), count, messages, {fields[i].decode(): fields[i + 1] for i in range(0, len(fields), 2)})
+
+    def save(self, sid, messages, fields):
+        version_key, messages_key, fields_key = self._keys(sid)
+        # RPUSH only appends, and answers with the new length.
+        commands = [("RPUSH", messages_key, *messages) if messages else ("LLEN", messages_key)]
+        if fields:
+            commands.append(("HSET", fields_key, *(item for name, data in fields.items() for item in (name, data))))
+        commands += [("INCR", version_key)] + [("EXPIRE", key, self.ttl) for key in (version_key, messages_key, fields_key)]
+        replies = self.client.pipeline(commands)
+        return replies[len(commands) - 4], replies[0]
+
+
+class SessionStore:
+    """Loads and saves sessions through a backend, with a local read-through cache."""
+
+    def __init__(self, backend, cache_size=SESSION_CACHE_SIZE, cache_ttl=SESSION_CACHE_TTL,
+                 restore_messages=SESSION_RESTORE_MESSAGES, max_chars=HISTORY_MAX_CHARS):
+        self.backend = backend
+        self.restore_messages = restore_messages
+        self.max_chars = max_chars
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.cached_loads = 0
+        self.backend_loads = 0
+        self.writes = 0
+        self.bytes_written = 0
+
+    def load(self, sid):
+        """Return the session's ``SessionData`` (empty for a new session).
+
+        ``messages`` holds only the greeting and the newest messages within
+        the memory cap. A cached copy costs one version check, and when
+        another replica has written since, only the messages it added are read.
+        """
+        cached = self._cache.get(sid)
+        if cached is not None and self.backend.version(sid) == cached.version:
+            self.cached_loads += 1
+            return cached
+        self.backend_loads += 1
+        start = cached.count if cached is not None else 0
+        data = self.backend.load(sid, start, self.restore_messages)
+        if data.count < start:
+            # Expired and started again elsewhere: read it afresh.
+            start, data = 0, self.backend.load(sid, 0, self.restore_messages)
+        messages = (cached.messages if start else []) + [unpack(message) for message in data.messages]
+        data.messages = cap_messages(messages, self.max_chars)
+        data.fields = {name: unpack(value) for name, value in data.fields.items()}
+        self._cache.set(sid, data)
+        return data
+
+    def save(self, sid, history, fields):
+        """Persist what changed since the last save of ``history`` (a ``ChatHistory``) and ``fields``."""
+        data = self._cache.get(sid) or self.load(sid)
+        # Messages the cap dropped before they were ever saved are skipped.
+        unsaved = min(history.dropped + len(history) - data.count, len(history))
+        new = [[message.role, message.content] for message in history.messages[len(history) - unsaved:]] if unsaved > 0 else []
+        changed = {name: value for name, value in fields.items() if name not in data.fields or data.fields[name] != value}
+        if not new and not changed:
+            return
+        packed_messages = [pack(message) for message in new]
+        packed_fields = {name: pack(value) for name, value in changed.items()}
+        self.writes += 1
+        self.bytes_written += sum(map(len, packed_messages)) + sum(map(len, packed_fields.values()))
+        version, count = self.backend.save(sid, packed_messages, packed_fields)
+        if count - len(new) != data.count:
+            # Another replica appended since our last read; read it afresh next time.
+            self._cache.discard(sid)
+            return
+        data.version = version
+        data.count = count
+        data.messages = cap_messages(data.messages + new, self.max_chars)
+        data.fields.update(changed)
+        self._cache.set(sid, data)
+
+    def stats(self):
+        return {
+            "cached_loads": self.cached_loads,
+            "backend_loads": self.backend_loads,
+            "writes": self.writes,
+            "bytes_written": self.bytes_written,
+        }
+
+
+def open_backend(url=SESSION_STORE):
+    """Build the backend named by a ``SESSION_STORE`` URL, or None for ``none``."""
+    if not url or url == "none":
+        return None
+    if url.startswith("sqlite:"):
+        # sqlite:sessions.db is relative, sqlite:///var/lib/sessions.db absolute.
+        path = url[len("sqlite:"):]
+        return SQLiteBackend(path[2:] if path.startswith("//") else path)
+    if url.startswith(("redis://", "resp://")):
+        return RedisBackend(RespClient.from_url(url))
+    raise ValueError(f"unknown SESSION_STORE {url!r}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """The process-wide session store, or None when ``SESSION_STORE`` is ``none``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = open_backend()
+                _store = SessionStore(backend) if backend is not None else False
+    return _store or None
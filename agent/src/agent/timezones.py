@@ -0,0 +1,157 @@
+"""IANA timezone handling for bookings.
+
+Offsets are always derived from the zone name with ``zoneinfo``, so DST is
+handled and users never type a GMT offset. Per-day offset tables let a
+whole grid of slot instants be converted with a few NumPy operations.
+"""
+import os
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+import numpy as np
+
+BUSINESS_TIMEZONE = os.getenv("BUSINESS_TIMEZONE", "Asia/Karachi")
+WORKING_HOURS_START = time.fromisoformat(os.getenv("WORKING_HOURS_START", "09:00"))
+WORKING_HOURS_END = time.fromisoformat(os.getenv("WORKING_HOURS_END", "17:00"))
+SLOT_MINUTES = int(os.getenv("SLOT_MINUTES", "30"))
+MEETING_MINUTES = 60
+
+_DAY = 86400
+
+
+@lru_cache(maxsize=None)
+def timezone_names():
+    """All IANA zone names, sorted, for pickers."""
+    return tuple(sorted(available_timezones()))
+
+
+@lru_cache(maxsize=512)
+def get_zone(name):
+    """Return the ``ZoneInfo`` for ``name``; raises ``ValueError`` for unknown zones."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone {name!r}") from None
+
+
+def localize(day, clock, tz_name):
+    """Attach the zone to a wall-clock time; raises ``ValueError`` for times a DST jump skips."""
+    naive = datetime.combine(day, clock)
+    local = naive.replace(tzinfo=get_zone(tz_name))
+    if local.astimezone(timezone.utc).astimezone(local.tzinfo).replace(tzinfo=None) != naive:
+        raise ValueError(f"{naive:%Y-%m-%d %H:%M} does not exist in {tz_name} (DST change)")
+    return local
+
+
+def to_iso(day, clock, tz_name):
+    """ISO start time with the zone's offset on that date, e.g. ``2025-03-01T10:00:00+05:00``."""
+    return localize(day, clock, tz_name).isoformat()
+
+
+def utc_offset(tz_name, when=None):
+    """The zone's offset at the aware instant ``when`` (default now) as ``+HH:MM``."""
+    when = when or datetime.now(timezone.utc)
+    return _format_offset(int(when.astimezone(get_zone(tz_name)).utcoffset().total_seconds()))
+
+
+def end_time(start_time, minutes=MEETING_MINUTES, tz_name=None):
+    """ISO end of a meeting, with the offset in force at the end when ``tz_name`` is given.
+
+    Arithmetic is done on the absolute instant, so a meeting spanning a DST
+    change still lasts ``minutes``.
+    """
+    start = datetime.fromisoformat(start_time)
+    end = start + timedelta(minutes=minutes)
+    if tz_name and start.tzinfo is not None:
+        end = end.astimezone(get_zone(tz_name))
+    return end.isoformat()
+
+
+def check_working_hours(start_time, minutes=MEETING_MINUTES, business_timezone=BUSINESS_TIMEZONE):
+    """Raise ``ValueError`` unless the meeting fits the business day in ``business_timezone``."""
+    start = datetime.fromisoformat(start_time)
+    if start.tzinfo is None:
+        raise ValueError(f"{start_time!r} has no UTC offset")
+    local_start = start.astimezone(get_zone(business_timezone))
+    local_end = (start + timedelta(minutes=minutes)).astimezone(get_zone(business_timezone))
+    if local_start.date() != local_end.date() or local_start.time() < WORKING_HOURS_START or local_end.time() > WORKING_HOURS_END:
+        raise ValueError(
+            f"Meetings must be between {WORKING_HOURS_START:%H:%M} and {WORKING_HOURS_END:%H:%M} "
+            f"{business_timezone}; that is {local_start:%H:%M}-{local_end:%H:%M} there."
+        )
+
+
+def check_upcoming(start_time, now=None):
+    """Raise ``ValueError`` unless ``start_time`` is still ahead of ``now`` (default: the current time)."""
+    start = datetime.fromisoformat(start_time)
+    if start.tzinfo is None:
+        raise ValueError(f"{start_time!r} has no UTC offset")
+    if start <= (now or datetime.now(timezone.utc)):
+        raise ValueError(f"{start:%Y-%m-%d %H:%M} has already passed; please pick a later time.")
+
+
+@lru_cache(maxsize=1024)
+def offset_table(tz_name, utc_day):
+    """Offsets in force during one UTC day, as ``(boundaries, offsets)`` arrays.
+
+    ``boundaries`` are epoch seconds where each offset starts; a day holds
+    one entry unless a DST transition falls inside it.
+    """
+    zone = get_zone(tz_name)
+    start = datetime.combine(utc_day, time(), timezone.utc)
+    begin = int(start.timestamp())
+    first = int(start.astimezone(zone).utcoffset().total_seconds())
+    last = int((start + timedelta(seconds=_DAY - 1)).astimezone(zone).utcoffset().total_seconds())
+    if first == last:
+        return np.array([begin], dtype=np.int64), np.array([first], dtype=np.int64)
+    # Bisect to the second at which the offset changes.
+    low, high = begin, begin + _DAY - 1
+    while high - low > 1:
+        middle = (low + high) // 2
+        if int(datetime.fromtimestamp(middle, zone).utcoffset().total_seconds()) == first:
+            low = middle
+        else:
+            high = middle
+    return np.array([begin, high], dtype=np.int64), np.array([first, last], dtype=np.int64)
+
+
+def offsets_at(instants, tz_name):
+    """UTC offsets in seconds of ``tz_name`` at each epoch second in ``instants``."""
+    instants = np.asarray(instants, dtype=np.int64)
+    offsets = np.empty_like(instants)
+    days = instants // _DAY
+    for day in np.unique(days):
+        boundaries, day_offsets = offset_table(tz_name, datetime.fromtimestamp(int(day) * _DAY, timezone.utc).date())
+        mask = days == day
+        offsets[mask] = day_offsets[np.searchsorted(boundaries, instants[mask], side="right") - 1]
+    return offsets
+
+
+def slot_grid(day, step_minutes=SLOT_MINUTES, minutes=MEETING_MINUTES, business_timezone=BUSINESS_TIMEZONE):
+    """Epoch seconds of every meeting start that fits the working hours of ``day``."""
+    first = int(localize(day, WORKING_HOURS_START, business_timezone).timestamp())
+    last = int(localize(day, WORKING_HOURS_END, business_timezone).timestamp()) - minutes * 60
+    return np.arange(first, last + 1, step_minutes * 60, dtype=np.int64)
+
+
+def to_iso_many(instants, tz_name):
+    """ISO start times with offsets for a whole array of epoch seconds in ``tz_name``."""
+    instants = np.asarray(instants, dtype=np.int64)
+    offsets = offsets_at(instants, tz_name)
+    walls = np.datetime_as_string((instants + offsets).astype("datetime64[s]"), unit="s")
+    labels = {int(offset): _format_offset(int(offset)) for offset in np.unique(offsets)}
+    return [f"{wall}{labels[offset]}" for wall, offset in zip(walls.tolist(), offsets.tolist())]
+
+
+def working_hours_slots(day, tz_name, minutes=MEETING_MINUTES, step_minutes=SLOT_MINUTES, business_timezone=BUSINESS_TIMEZONE, now=None):
+    """The business day's meeting starts for ``day`` still ahead of ``now``, as ISO times in the user's zone."""
+    instants = slot_grid(day, step_minutes, minutes, business_timezone)
+    cutoff = (now or datetime.now(timezone.utc)).timestamp()
+    return to_iso_many(instants[instants > cutoff], tz_name)
+
+
+def _format_offset(seconds):
+    sign = "-" if seconds < 0 else "+"
+    hours, minutes = divmod(abs(seconds) // 60, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
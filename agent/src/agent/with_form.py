@@ -1,238 +1,313 @@
 import streamlit as st
-from datetime import datetime, timedelta, time as dtime
-from crewai.flow.flow import Flow
-from litellm import completion
 import os
-from dotenv import load_dotenv
-import requests
+from datetime import datetime
+from agent.availability import format_slot, get_free_slots, is_bookable
+from agent.chat_ui import queue_booking, render_history, rerun_pane, restore_session, save_session, saves_session
+from agent.extraction import extract_booking
+from agent.intents import canned_answer, classify_intent
+from agent.knowledge import knowledge_context
+from agent.llm import STREAM_RESPONSES, complete, stream
+from agent.metrics import profiled, start_exporters, timed
+from agent.prompting import assemble_prompt
+from agent.routing import KeywordRouter
+from agent.runtime import Runtime, load_env
+from agent.timezones import BUSINESS_TIMEZONE, timezone_names, working_hours_slots
+
+load_env()
+
+SYSTEM_PROMPT = """You are the assistant of AICongiTech, which redefines health and wellness with AI innovations in FemTech, AgeTech, HealthTech and Longevity. Answer briefly and helpfully, and offer to schedule a meeting when the user wants to talk to the team. Working hours are 9:00 AM to 5:00 PM every day."""
+
+INTENT_ROUTES = {
+    "scheduling": "schedule_route",
+    "hours": "canned_route",
+    "smalltalk": "canned_route",
+    "bye": "canned_route",
+}
+
+# Session-state flags shared through the session store with other replicas.
+SESSION_KEYS = ("show_form", "event_type")
+
+GREETING = """Welcome to AICongiTech! 🌟  
 
-load_dotenv()
-
-CALCOM_API_KEY = os.getenv("CALCOM_API_KEY")
-CALCOM_BASE_URL = "https://api.cal.com/v1"
-HEADERS = {"Content-Type": "application/json"}
-QUERYSTRING = {"apiKey": CALCOM_API_KEY}
+We are revolutionizing health and wellness through cutting-edge AI innovations in FemTech, AgeTech, HealthTech, and Longevity. By addressing unique challenges in each sector, we deliver strategic solutions that redefine personalized care and well-being, shaping healthier, more fulfilling futures for all.  
 
-EVENT_TYPE = {'id': 1854515, 'title': 'AiCogniTech'}
+How can we assist you today? 😊"""
+
+# Injected by the full rerun only; fragment reruns leave it in place.
+CSS = """
+<style>
+    div[data-testid="stChatInput"] {
+        position: fixed !important;
+        bottom: 10px !important;
+        left: 3rem !important;
+        width: 57.5% !important;
+        background-color: #262730 !important;
+        z-index: 1000 !important;
+        border-top: 1px solid #ddd !important;
+    }
+    .main {
+        padding-bottom: 100px !important;
+    }
+    [data-testid="column"]:first-child {
+        height: calc(100vh - 200px) !important;
+        overflow-y: auto !important;
+    }
+    [data-testid="column"]:last-child {
+        height: calc(100vh - 200px) !important;
+        overflow-y: auto !important;
+    }
+    .stChatMessage {
+        margin-bottom: 1rem !important;
+    }
+</style>
+"""
 
 def initialize_chat_history():
     if "messages" not in st.session_state:
-        st.session_state.messages = [
-            {"role": "assistant", "content": """Welcome to AICongiTech! 🌟  
+        restore_session(get_runtime().sessions, GREETING, SESSION_KEYS)
 
-We are revolutionizing health and wellness through cutting-edge AI innovations in FemTech, AgeTech, HealthTech, and Longevity. By addressing unique challenges in each sector, we deliver strategic solutions that redefine personalized care and well-being, shaping healthier, more fulfilling futures for all.  
+BOOKING_POLL_INTERVAL = 0.5
+
+LOCATIONS = ["inPerson", "online", "phone"]
+
+@st.fragment(run_every=BOOKING_POLL_INTERVAL)
+def booking_status():
+    """Poll a queued booking on a timer, rerunning only this fragment until the result arrives."""
+    pending = st.session_state.get("pending_booking")
+    if not pending:
+        return
 
-How can we assist you today? 😊"""}
-        ]
-
-def schedule_booking(event_id, name, email, start_time, location="inPerson", title="Meeting", description="", timezone="Asia/Karachi"):
-    """Schedule a booking on Cal.com."""
-    try:
-        start_datetime = datetime.fromisoformat(start_time)
-        end_datetime = start_datetime + timedelta(minutes=60)
-        end_time = end_datetime.isoformat()
-
-        url = f"{CALCOM_BASE_URL}/bookings"
-        payload = {
-            "eventTypeId": event_id,
-            "start": start_time,
-            "end": end_time,
-            "responses": {
-                "name": name,
-                "email": email,
-                "location": {
-                    "optionValue": "",
-                    "value": location
-                }
-            },
-            "metadata": {},
-            "timeZone": timezone,
-            "language": "en",
-            "title": title,
-            "description": description,
-            "status": "PENDING"
-        }
-        response = requests.post(url, headers=HEADERS, json=payload, params=QUERYSTRING)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error scheduling the booking.")
-        if e.response is not None:
-            try:
-                error_message = e.response.json().get("message", "An error occurred.")
-                st.error(error_message) 
-            except ValueError:
-                st.error("Invalid response format from server.")
-        return None
+    result = get_runtime().pipeline.poll(pending["ticket"])
+    if result is None:
+        st.info("Scheduling your appointment...")
+        return
+
+    del st.session_state.pending_booking
+    if result.ok:
+        confirmation_message = f"""
+                            Appointment scheduled successfully!
+
+                            Details:
+                            - Name: {pending["name"]}
+                            - Date: {pending["date"]}
+                            - Time: {pending["time"]} {pending["offset"]}
+                            - Location: {pending["location"]}
+                            - Title: {pending["title"]}
+
+                            Please check your email for confirmation and meeting details.
+                            """
+        st.session_state.messages.append({"role": "assistant", "content": confirmation_message})
+    else:
+        st.session_state.booking_error = result.error or "Failed to schedule the meeting. Please try again."
+    st.rerun()
 
 def show_working_hours():
     """Display working hours."""
     st.info("Our working hours are from 9:00 AM to 5:00 PM every day.")
 
-class StreamlitFlow(Flow):
+class StreamlitFlow:
     model = "gemini/gemini-2.0-flash"
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+    def __init__(self):
+        self.router = KeywordRouter.from_config(names=("schedule_route",))
+
+    @timed("process_user_input")
     def process_user_input(self, user_input):
-        if any(word in user_input.lower() for word in ["schedule", "book", "meeting", "appointment"]):
-            return "schedule_route"
-        else:
-            return "conversation_route"
+        route = self.router.route(user_input)
+        if route == "conversation_route":
+            route = INTENT_ROUTES.get(classify_intent(user_input), route)
+        return route
+
+    @timed("handle_canned")
+    def handle_canned(self, user_input):
+        return canned_answer(classify_intent(user_input))
 
-    def handle_conversation(self, user_input):
+    @timed("handle_conversation")
+    def handle_conversation(self, user_input, history=()):
         try:
-            response = completion(
-                model=self.model,
-                messages=[{"role": "user", "content": user_input}],
-                api_key=self.GEMINI_API_KEY
-            )
-            return response["choices"][0]["message"]["content"].strip()
+            messages = assemble_prompt(SYSTEM_PROMPT, history, user_input, knowledge_context(user_input))
+            return complete(self.model, messages, self.GEMINI_API_KEY)
         except Exception as e:
             return f"Error: {str(e)}"
 
-def main():
-    st.set_page_config(
-        page_title="AICongiTech Assistant",
-        page_icon="🤖",
-        layout="wide"
+    @timed("stream_conversation")
+    def stream_conversation(self, user_input, history=()):
+        try:
+            messages = assemble_prompt(SYSTEM_PROMPT, history, user_input, knowledge_context(user_input))
+            yield from stream(self.model, messages, self.GEMINI_API_KEY)
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
+@st.cache_resource
+def get_runtime():
+    """Build the flow once per process instead of on every rerun."""
+    return Runtime(StreamlitFlow())
+
+@st.fragment
+@saves_session(lambda: get_runtime().sessions, SESSION_KEYS)
+@timed("chat_pane")
+def chat_pane():
+    """Chat history and input; a message reruns only this pane unless it matches a meeting type."""
+    runtime = get_runtime()
+    flow = runtime.flow
+    st.subheader("💬 Chat With Our AI Agent")
+
+    messages_container = st.container()
+
+    with messages_container:
+        render_history(st.session_state.messages)
+
+        st.markdown("<div style='height: 100px'></div>", unsafe_allow_html=True)
+
+    if prompt := st.chat_input("Type your message here..."):
+        st.session_state.messages.append({"role": "user", "content": prompt})
+
+        route = flow.process_user_input(prompt)
+
+        if route == "schedule_route":
+            event_type = runtime.event_types.match(prompt)
+            st.session_state.event_type = event_type.slug
+            details = extract_booking(prompt)
+            if details.complete and is_bookable(event_type.id, details.start_time, details.timezone, event_type.length):
+                # The message says who, when and where: book it without the form.
+                error = queue_booking(
+                    runtime, event_type, details.name, details.email, details.start_time,
+                    details.location or "inPerson", event_type.title, prompt, details.timezone
+                )
+                response = error or f"Booking your {event_type.title} on {datetime.fromisoformat(details.start_time):%A %d %B at %H:%M} for {details.name}..."
+            elif details.found:
+                response = "I'll help you schedule an appointment. I've filled in what you told me; please check the form on the right."
+                st.session_state.booking_details = details.as_dict()
+            else:
+                response = "I'll help you schedule an appointment. Please fill out the form on the right."
+            st.session_state.show_form = True
+        elif route == "canned_route":
+            response = flow.handle_canned(prompt)
+        elif STREAM_RESPONSES:
+            with messages_container:
+                with st.chat_message("user"):
+                    st.write(prompt)
+                with st.chat_message("assistant"):
+                    response = st.write_stream(flow.stream_conversation(prompt, st.session_state.messages[1:-1]))
+        else:
+            response = flow.handle_conversation(prompt, st.session_state.messages[1:-1])
+
+        st.session_state.messages.append({"role": "assistant", "content": response})
+        # The form pane preselects the matched meeting type, so it has to rerun too.
+        if route == "schedule_route":
+            st.rerun()
+        rerun_pane()
+
+@st.fragment
+@timed("form_pane")
+def form_pane():
+    """The scheduling form; changing a field reruns only this pane."""
+    runtime = get_runtime()
+    prefill = st.session_state.get("booking_details") or {}
+    st.subheader("📅 Schedule Appointment")
+    show_working_hours()  
+
+    # Meeting type, date and timezone live outside the form so that
+    # changing them refreshes the list of free slots below.
+    # Bind the registry once; a background sync may swap it mid-render.
+    registry = runtime.event_types
+    event_types = list(registry)
+    event_type = st.selectbox(
+        "Meeting Type", options=event_types, format_func=lambda e: f"{e.title} ({e.length} min)",
+        index=event_types.index(registry.get(st.session_state.get("event_type"))),
     )
 
-    st.markdown("""
-        <style>
-            div[data-testid="stChatInput"] {
-                position: fixed !important;
-                bottom: 10px !important;
-                left: 3rem !important;
-                width: 57.5% !important;
-                background-color: #262730 !important;
-                z-index: 1000 !important;
-                border-top: 1px solid #ddd !important;
-            }
-            .main {
-                padding-bottom: 100px !important;
-            }
-            [data-testid="column"]:first-child {
-                height: calc(100vh - 200px) !important;
-                overflow-y: auto !important;
-            }
-            [data-testid="column"]:last-child {
-                height: calc(100vh - 200px) !important;
-                overflow-y: auto !important;
-            }
-            .stChatMessage {
-                margin-bottom: 1rem !important;
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    date = st.date_input("Preferred Meeting Date", value=prefill.get("day") or "today")
 
-    st.title("🤖 AICongiTech Assistant")
-    st.markdown("---")
+    timezones = timezone_names()
+    timezone = st.selectbox(
+        "Timezone", options=timezones, index=timezones.index(prefill.get("timezone") or BUSINESS_TIMEZONE),
+        help="Your timezone; the GMT offset is worked out from it"
+    )
 
-    initialize_chat_history()
-    flow = StreamlitFlow()
+    slots = get_free_slots(event_type.id, date, timezone)
+    if slots is None:
+        # Cal.com is unreachable; offer the working-hours grid instead.
+        slots = working_hours_slots(date, timezone, event_type.length)
 
-    chat_col, form_col = st.columns([2, 1])
+    with st.form("scheduling_form"):
+        name = st.text_input("Name", value=prefill.get("name") or "", placeholder="Your name")
+        email = st.text_input("Email", value=prefill.get("email") or "", placeholder="your.email@example.com")
 
-    with chat_col:
-        st.subheader("💬 Chat With Our AI Agent")
-
-        messages_container = st.container()
+        if slots:
+            slot = st.selectbox(
+                "Preferred Meeting Time", options=slots, format_func=format_slot,
+                index=slots.index(prefill["start_time"]) if prefill.get("start_time") in slots else 0,
+                help="Only free slots are listed"
+            )
+        else:
+            st.warning("There are no free slots on this date. Please pick another day.")
+            slot = None
 
-        with messages_container:
-            for message in st.session_state.messages:
-                with st.chat_message(message["role"]):
-                    st.write(message["content"])
+        location = st.selectbox(
+            "Location", options=LOCATIONS, index=LOCATIONS.index(prefill.get("location") or "inPerson"),
+            help="Select meeting location type"
+        )
 
-            st.markdown("<div style='height: 100px'></div>", unsafe_allow_html=True)
+        title = st.text_input(
+            "Meeting Title", value=event_type.title,
+            help="Enter the title for your meeting"
+        )
 
-        if prompt := st.chat_input("Type your message here..."):
-            st.session_state.messages.append({"role": "user", "content": prompt})
+        description = st.text_area(
+            "Description", placeholder="Enter any additional details or notes for the meeting"
+        )
 
-            route = flow.process_user_input(prompt)
+        submitted = st.form_submit_button("Schedule Meeting")
 
-            if route == "schedule_route":
-                response = "I'll help you schedule an appointment. Please fill out the form on the right."
-                st.session_state.show_form = True
+        if submitted:
+            st.session_state.pop("booking_error", None)
+            if not all([name, email, date, slot, timezone]):
+                st.error("Please fill in all required fields.")
             else:
-                response = flow.handle_conversation(prompt)
-
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            st.rerun()
+                error = queue_booking(runtime, event_type, name, email, slot, location, title, description, timezone)
+                if error:
+                    st.error(error)
+                else:
+                    # Polling runs in its own fragment, which only a full rerun starts.
+                    st.rerun()
 
-    with form_col:
-        st.subheader("📅 Schedule Appointment")
-        show_working_hours()  
-        with st.form("scheduling_form"):
-            name = st.text_input("Name", placeholder="Your name")
-            email = st.text_input("Email", placeholder="your.email@example.com")
-
-            date = st.date_input("Preferred Meeting Date")
-            time = st.time_input("Preferred Meeting Time")
-
-            timezone = st.text_input(
-                "Timezone", value="Asia/Karachi",
-                help="Enter your timezone (e.g., Asia/Karachi)"
-            )
+    if st.session_state.get("booking_error"):
+        st.error("Error scheduling the booking.")
+        st.error(st.session_state.booking_error)
 
-            gmt_offset = st.text_input(
-                "GMT Offset", value="+05:00",
-                help="Enter your GMT offset (e.g., +05:00)"
-            )
+@timed("streamlit_rerun")
+def main():
+    st.set_page_config(
+        page_title="AICongiTech Assistant",
+        page_icon="🤖",
+        layout="wide"
+    )
 
-            location = st.selectbox(
-                "Location", options=["inPerson", "online", "phone"],
-                help="Select meeting location type"
-            )
+    st.markdown(CSS, unsafe_allow_html=True)
 
-            title = st.text_input(
-                "Meeting Title", value="AiCogniTech Consultation",
-                help="Enter the title for your meeting"
-            )
+    st.title("🤖 AICongiTech Assistant")
+    st.markdown("---")
 
-            description = st.text_area(
-                "Description", placeholder="Enter any additional details or notes for the meeting"
-            )
+    start_exporters()
+    initialize_chat_history()
 
-            submitted = st.form_submit_button("Schedule Meeting")
+    chat_col, form_col = st.columns([2, 1])
 
-            if submitted:
-                if not all([name, email, date, time, timezone]):
-                    st.error("Please fill in all required fields.")
-                else:
-                    start_time = f"{date}T{time.strftime('%H:%M:%S')}{gmt_offset}"
-
-                    with st.spinner("Scheduling your appointment..."):
-                        result = schedule_booking(
-                            EVENT_TYPE['id'],
-                            name,
-                            email,
-                            start_time,
-                            location,
-                            title,
-                            description,
-                            timezone
-                        )
-
-                        if result:
-                            st.success("Meeting scheduled successfully!")
-                            st.json(result)
-
-                            confirmation_message = f"""
-                            Appointment scheduled successfully!
+    with chat_col:
+        chat_pane()
 
-                            Details:
-                            - Name: {name}
-                            - Date: {date}
-                            - Time: {time.strftime('%H:%M:%S')} {gmt_offset}
-                            - Location: {location}
-                            - Title: {title}
+    with form_col:
+        form_pane()
 
-                            Please check your email for confirmation and meeting details.
-                            """
-                            st.session_state.messages.append({"role": "assistant", "content": confirmation_message})
-                            st.rerun()
-                        else:
-                            st.error("Failed to schedule the meeting. Please try again.")
+        if st.session_state.get("pending_booking"):
+            booking_status()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profiled(st.query_params.get("profile") == "1", "streamlit"):
+        try:
+            main()
+        finally:
+            # st.rerun() ends a run with an exception; save on every exit.
+            save_session(get_runtime().sessions, SESSION_KEYS)
\ No newline at end of file